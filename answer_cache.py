@@ -0,0 +1,36 @@
+import re
+
+from sqlite_cache import SQLiteCache
+
+DEFAULT_ANSWER_CACHE_PATH = "answer_cache.sqlite"
+DEFAULT_ANSWER_TTL = 7 * 24 * 3600  # secondes
+DEFAULT_ANSWER_CACHE_SIZE = 100000
+
+def normalize_question(question):
+    """
+    Normalise une question pour la clé du cache : minuscules, espaces fusionnés
+    et ponctuation finale supprimée ("Who is the CEO of Apple ?" == "who is the ceo of apple").
+    """
+    question = re.sub(r"\s+", " ", question.lower()).strip()
+    return re.sub(r"[\s?.!]+$", "", question)
+
+class AnswerCache:
+    """
+    Cache persistant des réponses finales du pipeline, indexé par question normalisée.
+    Seules les réponses exécutées avec succès sont conservées.
+    """
+
+    def __init__(self, path=DEFAULT_ANSWER_CACHE_PATH, ttl=DEFAULT_ANSWER_TTL, max_entries=DEFAULT_ANSWER_CACHE_SIZE):
+        self.store = SQLiteCache(path, ttl=ttl, max_entries=max_entries, table="answers")
+
+    def get(self, question):
+        """Retourne le résultat mis en cache pour la question, ou None."""
+        return self.store.get(normalize_question(question))
+
+    def put(self, question, result):
+        """Enregistre le résultat d'une question s'il a bien été exécuté."""
+        if isinstance(result, dict) and result.get("executed", False):
+            self.store.put(normalize_question(question), result)
+
+    def stats(self):
+        return self.store.stats()
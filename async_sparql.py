@@ -0,0 +1,110 @@
+import asyncio
+
+from endpoint_client import (get_default_client, EndpointClient, SparqlEndpointError, DEFAULT_CONNECT_TIMEOUT,
+                             DEFAULT_READ_TIMEOUT, DEFAULT_SERVER_TIMEOUT, MAX_GET_QUERY_LENGTH)
+from sparql_cache import get_result_cache, cache_key
+
+DEFAULT_CONCURRENCY = 8
+
+class AsyncSparqlExecutor:
+    """
+    Exécute un lot de requêtes SPARQL en parallèle avec httpx et asyncio.
+
+    Au plus `concurrency` requêtes sont en vol en même temps, chacune bornée par `timeout`
+    secondes. Les résultats ont le format de sparql_utils.execute_sparql_query et passent
+    par le cache de résultats partagé ; une requête présente plusieurs fois dans le lot
+    n'est envoyée qu'une fois.
+    """
+
+    def __init__(self, endpoint=None, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_READ_TIMEOUT, connect_timeout=DEFAULT_CONNECT_TIMEOUT, use_cache=True,
+                 server_timeout=DEFAULT_SERVER_TIMEOUT):
+        # Par défaut, le même endpoint que le client synchrone partagé
+        self.endpoint = endpoint
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.use_cache = use_cache
+        self.server_timeout = server_timeout
+
+    async def _fetch(self, client, semaphore, endpoint, query):
+        import httpx
+
+        data = {"query": query, "format": "json"}
+        if self.server_timeout:
+            data["timeout"] = self.server_timeout
+        async with semaphore:
+            try:
+                if len(query) > MAX_GET_QUERY_LENGTH:
+                    request = client.post(endpoint, data=data)
+                else:
+                    request = client.get(endpoint, params=data)
+                response = await asyncio.wait_for(request, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                return {"success": False, "error": f"Timeout after {self.timeout}s"}
+            except httpx.HTTPError as e:
+                return {"success": False, "error": str(e) or type(e).__name__}
+
+        if response.status_code >= 400:
+            body = " ".join(response.text.split())[:500]
+            return {"success": False, "error": f"HTTP {response.status_code} {response.reason_phrase}: {body}",
+                    "status": response.status_code}
+        try:
+            return {"success": True, "results": response.json()}
+        except ValueError as e:
+            return {"success": False, "error": f"Invalid JSON response: {e}"}
+
+    async def _query_client(self, client, semaphore, query):
+        async with semaphore:
+            try:
+                results = await asyncio.to_thread(client.query, query)
+            except SparqlEndpointError as e:
+                return {"success": False, "error": str(e), "status": e.status}
+        return {"success": True, "results": results}
+
+    async def execute_all(self, queries):
+        """
+        Exécute toutes les requêtes et retourne leurs résultats dans le même ordre.
+        """
+        cache = get_result_cache() if self.use_cache else None
+        outcomes = {}
+        to_fetch = {}
+        for query in queries:
+            key = cache_key(query)
+            if key in outcomes or key in to_fetch:
+                continue
+            cached = cache.get(query) if cache is not None else None
+            if cached is not None:
+                outcomes[key] = cached
+            else:
+                to_fetch[key] = query
+
+        client = get_default_client()
+        if self.endpoint is None and not isinstance(client, EndpointClient):
+            # Miroirs ou graphe local (voir endpoint_client.configure_endpoint) :
+            # les requêtes passent par le client partagé, dans des threads
+            semaphore = asyncio.Semaphore(self.concurrency)
+            fetched = await asyncio.gather(*(self._query_client(client, semaphore, q) for q in to_fetch.values()))
+        else:
+            fetched = await self._fetch_all(self.endpoint or client.endpoint, list(to_fetch.values()))
+
+        for (key, query), outcome in zip(to_fetch.items(), fetched):
+            outcomes[key] = outcome
+            if cache is not None:
+                cache.put(query, outcome)
+
+        return [outcomes[cache_key(query)] for query in queries]
+
+    async def _fetch_all(self, endpoint, queries):
+        import httpx
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        headers = {"Accept": "application/sparql-results+json", "Accept-Encoding": "gzip, deflate"}
+        async with httpx.AsyncClient(limits=limits, timeout=timeout, headers=headers) as client:
+            return await asyncio.gather(*(self._fetch(client, semaphore, endpoint, q) for q in queries))
+
+    def run(self, queries):
+        """Version synchrone de execute_all."""
+        return asyncio.run(self.execute_all(list(queries)))
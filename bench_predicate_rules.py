@@ -0,0 +1,226 @@
+import argparse
+import time
+
+from generate_sparql import load_json_file, fix_dbr_resources
+from predicate_rules import PredicateRanker
+
+def legacy_predicate_candidates(template_id, question_data, mappings):
+    """Copie des trois chaînes if/elif de generate_sparql_query avant predicate_rules (priorité par prédicat)."""
+    # Define low-priority predicates (common but often not semantically meaningful)
+    low_priority_predicates = ['is', 'was', 'are', 'were', 'does', 'did', 'has', 'have', 'had', 'in', 'on', 'at', 'by', 'to', 'for']
+    
+    if template_id == 'A':
+        # Create a dictionary to store predicate candidates and their priorities
+        predicate_candidates = {}
+        
+        # Next, identify potential predicates and set their priority
+        question_lower = question_data['question'].lower()
+        
+        # Scan all predicates and rate them
+        for key, value in mappings.items():
+            if not value.startswith('dbo:'):
+                continue
+                
+            # Extract the predicate name without prefix
+            pred_name = value[4:].lower()
+            
+            # Skip if the predicate is in the low priority list
+            if pred_name.lower() in low_priority_predicates:
+                predicate_candidates[value] = 1  # Lowest priority
+                continue
+            
+            # Check for common question patterns and assign priorities
+            priority = 2  # Default priority
+            
+            # Birth year questions
+            if ("born" in question_lower or "birth" in question_lower) and ("year" in question_lower):
+                if "birth" in key.lower() or "born" in key.lower() or "year" in key.lower():
+                    priority = 10
+                    if key.lower() == "birthyear" or key.lower() == "birth year":
+                        priority = 15  # Highest priority
+                
+            # Death year questions
+            elif ("die" in question_lower or "death" in question_lower) and ("year" in question_lower):
+                if "death" in key.lower() or "die" in key.lower() or "year" in key.lower():
+                    priority = 10
+                    if key.lower() == "deathyear" or key.lower() == "death year":
+                        priority = 15  # Highest priority
+                        
+            # Location questions
+            elif any(loc in question_lower for loc in ["where", "location", "place"]):
+                if any(loc in key.lower() for loc in ["location", "place", "country", "city"]):
+                    priority = 10
+            
+            # Author questions
+            elif any(auth in question_lower for auth in ["who wrote", "author", "writer"]):
+                if any(auth in key.lower() for auth in ["author", "writer", "wrote"]):
+                    priority = 10
+            
+            # Creation date questions
+            elif any(date in question_lower for date in ["when", "date", "year"]) and any(create in question_lower for create in ["create", "found", "establish"]):
+                if any(date in key.lower() for date in ["date", "year", "found", "establish", "create"]):
+                    priority = 10
+            
+            # Currency questions
+            elif "currency" in question_lower:
+                if "currency" in key.lower():
+                    priority = 15
+            
+            # Specific semantic actions
+            relevant_actions = ["start", "end", "direct", "write", "compose", "invent", "discover", "marry", "spouse", "starring", "actor", "actress"]
+            for action in relevant_actions:
+                if action in question_lower and action in key.lower():
+                    priority = 10
+                    break
+            
+            # Store the predicate with its priority
+            predicate_candidates[value] = priority
+        
+    elif template_id == 'B':
+        # Create a dictionary to store predicate candidates and their priorities
+        predicate_candidates = {}
+        
+        # Process predicates
+        question_lower = question_data['question'].lower()
+        
+        for key, value in mappings.items():
+            if not value.startswith('dbo:'):
+                continue
+                
+            # Extract the predicate name without prefix
+            pred_name = value[4:].lower()
+            
+            # Skip if the predicate is in the low priority list
+            if pred_name.lower() in low_priority_predicates:
+                predicate_candidates[value] = 1  # Lowest priority
+                continue
+            
+            # Check for common question patterns for B template
+            priority = 2  # Default priority
+            
+            # Actor/Actress questions
+            if any(actor in question_lower for actor in ["actor", "actress", "star", "cast"]):
+                if any(act in key.lower() for act in ["actor", "actress", "star", "cast"]):
+                    priority = 10
+            
+            # Author/Writer questions
+            elif any(writer in question_lower for writer in ["author", "writer", "wrote"]):
+                if any(write in key.lower() for write in ["author", "writer", "wrote"]):
+                    priority = 10
+            
+            # Director questions
+            elif "director" in question_lower:
+                if "direct" in key.lower():
+                    priority = 10
+            
+            # Other relationships
+            relevant_actions = ["spouse", "marry", "child", "parent", "discover", "invent", "found", "create", "currency"]
+            for action in relevant_actions:
+                if action in question_lower and action in key.lower():
+                    priority = 10
+                    break
+            
+            # Store the predicate with its priority
+            predicate_candidates[value] = priority
+        
+    elif template_id == 'D':
+        # Create a dictionary to store predicate candidates and their priorities
+        predicate_candidates = {}
+        
+        # Process predicates
+        question_lower = question_data['question'].lower()
+        
+        for key, value in mappings.items():
+            if not value.startswith('dbo:'):
+                continue
+                
+            # Extract the predicate name without prefix
+            pred_name = value[4:].lower()
+            
+            # Skip if the predicate is in the low priority list
+            if pred_name.lower() in low_priority_predicates:
+                predicate_candidates[value] = 1  # Lowest priority
+                continue
+            
+            # Check for common question patterns for D template
+            priority = 2  # Default priority
+            
+            # Relationship questions
+            if any(rel in question_lower for rel in ["spouse", "married", "husband", "wife"]):
+                if any(rel in key.lower() for rel in ["spouse", "married", "husband", "wife"]):
+                    priority = 10
+            
+            # Parent/Child questions
+            elif any(rel in question_lower for rel in ["parent", "child", "son", "daughter", "father", "mother"]):
+                if any(rel in key.lower() for rel in ["parent", "child", "son", "daughter", "father", "mother"]):
+                    priority = 10
+            
+            # Currency questions
+            elif "currency" in question_lower:
+                if "currency" in key.lower():
+                    priority = 15
+            
+            # Other specific relationships
+            relevant_actions = ["direct", "create", "write", "compose", "discover", "invent", "found"]
+            for action in relevant_actions:
+                if action in question_lower and action in key.lower():
+                    priority = 10
+                    break
+            
+            # Store the predicate with its priority
+            predicate_candidates[value] = priority
+        
+    else:
+        return {}
+    
+    return predicate_candidates
+
+def bench(function, items, repeat):
+    """Meilleur temps (secondes) d'une passe sur tous les éléments, sur `repeat` passes."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            function(*item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark du classement des prédicats (predicate_rules) contre l'ancienne version")
+    parser.add_argument("--questions", default="mapped_classified_questions.json", help="Questions classées et mappées")
+    parser.add_argument("--repeat", type=int, default=20, help="Nombre de passes chronométrées")
+    parser.add_argument("--scale", type=int, default=1, help="Nombre de copies des questions (corpus plus gros)")
+    args = parser.parse_args()
+
+    ranker = PredicateRanker()
+    # Même entrée que dans generate_sparql_query : templates connus, ressources corrigées
+    items = [(question["template_id"], question, fix_dbr_resources(question.get("mapping", {})))
+             for question in load_json_file(args.questions) if question.get("template_id") in ("A", "B", "D")]
+    items *= args.scale
+
+    # Les deux versions doivent donner exactement les mêmes priorités
+    mismatches = [i for i, (template_id, question, mappings) in enumerate(items)
+                  if ranker.score(template_id, question["question"], mappings) != legacy_predicate_candidates(template_id, question, mappings)]
+    if mismatches:
+        print(f"{len(mismatches)} différence(s), premiers éléments : {mismatches[:10]}")
+        return 1
+
+    def legacy_best(template_id, question, mappings):
+        candidates = legacy_predicate_candidates(template_id, question, mappings)
+        return max(candidates.items(), key=lambda x: x[1])[0] if candidates else None
+
+    def compiled_best(template_id, question, mappings):
+        return ranker.best_predicate(template_id, question["question"], mappings)
+
+    # Passe de chauffe : caches des mots et des clés remplis comme en régime établi
+    bench(compiled_best, items, 1)
+    legacy = bench(legacy_best, items, args.repeat)
+    compiled = bench(compiled_best, items, args.repeat)
+    print(f"{len(items)} questions (templates A/B/D), priorités identiques")
+    print(f"Règles if/elif  : {legacy * 1e6 / len(items):8.2f} µs/question")
+    print(f"Règles compilées: {compiled * 1e6 / len(items):8.2f} µs/question")
+    print(f"Accélération    : x{legacy / compiled:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
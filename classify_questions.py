@@ -1,20 +1,24 @@
-from flair.data import Sentence
-
-def predict_template(question, classifier_model):
+def predict_template(question, classifier_model, embedding_cache=None):
     """
     Prédit le template associé à une question en utilisant le modèle de template classifier.
 
     Args:
         question (str): La question en langage naturel.
         classifier_model (TextClassifier): Le modèle Flair entraîné pour la classification des templates.
+        embedding_cache (EmbeddingCache, optional): Cache disque des embeddings de tokens.
 
     Returns:
         str: Le template prédit (par exemple "A", "B", "D" ou "unknown").
     """
+    from flair.data import Sentence
+
     # Créer l'objet Sentence à partir de la question
     sentence = Sentence(question)
     
     # Appliquer le modèle pour prédire le template
+    if embedding_cache is not None:
+        from embedding_cache import embed_with_cache
+        embed_with_cache([sentence], classifier_model.embeddings.embeddings, embedding_cache)
     classifier_model.predict(sentence)
     
     # Récupérer le label "template" prédit
@@ -23,3 +27,41 @@ def predict_template(question, classifier_model):
         return labels[0].value
     else:
         return "unknown"
+
+def predict_templates(questions, classifier_model, mini_batch_size=32, embedding_cache=None):
+    """
+    Prédit les templates d'une liste de questions en un seul appel au modèle (mini-batchs Flair).
+
+    Args:
+        questions (list): Les questions en langage naturel.
+        classifier_model (TextClassifier): Le modèle Flair entraîné pour la classification des templates.
+        mini_batch_size (int): Taille des mini-batchs Flair.
+        embedding_cache (EmbeddingCache, optional): Cache disque des embeddings de tokens.
+
+    Returns:
+        list: Les templates prédits, dans l'ordre des questions.
+    """
+    from flair.data import Sentence
+
+    sentences = [Sentence(question) for question in questions]
+    if sentences:
+        if embedding_cache is not None:
+            from embedding_cache import embed_with_cache
+            embed_with_cache(sentences, classifier_model.embeddings.embeddings, embedding_cache)
+        classifier_model.predict(sentences, mini_batch_size=mini_batch_size)
+
+    return [extract_template(sentence) for sentence in sentences]
+
+def extract_template(sentence):
+    """
+    Lit le label "template" prédit sur une Sentence Flair déjà classée ("unknown" si absent).
+    """
+    labels = sentence.get_labels("template")
+    return labels[0].value if labels else "unknown"
+
+def extract_template_confidence(sentence):
+    """
+    Score du label "template" prédit sur une Sentence Flair déjà classée (0.0 si absent).
+    """
+    labels = sentence.get_labels("template")
+    return labels[0].score if labels else 0.0
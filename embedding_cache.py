@@ -0,0 +1,177 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+# Taille maximale du cache sur disque (octets)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+def normalize_sentence(text):
+    """
+    Normalise une phrase pour la clé du cache : Unicode NFC et espaces fusionnés.
+    La casse est conservée car les embeddings glove/Flair y sont sensibles.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+def stack_fingerprint(leaves):
+    """Empreinte d'une pile d'embeddings : noms et dimensions de chaque embedding, dans l'ordre."""
+    description = "|".join(f"{leaf.name}:{leaf.embedding_length}" for leaf in leaves)
+    return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Cache disque des embeddings de tokens, indexé par phrase normalisée et empreinte de la pile.
+
+    Chaque phrase est stockée dans un fichier .npy (matrice n_tokens x dimension, float32)
+    relu en mémoire mappée ; un index SQLite garde la taille et la date du dernier accès
+    de chaque entrée pour l'éviction LRU au-delà de max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, file TEXT NOT NULL, n_tokens INTEGER NOT NULL, "
+            "dim INTEGER NOT NULL, nbytes INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _key(text, fingerprint):
+        return hashlib.sha1(f"{fingerprint}\0{normalize_sentence(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, text, fingerprint):
+        """
+        Retourne la matrice d'embeddings (mémoire mappée, lecture seule) ou None si absente.
+        """
+        key = self._key(text, fingerprint)
+        with self._lock:
+            row = self._db.execute("SELECT file FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                array = np.load(os.path.join(self.directory, row[0]), mmap_mode="r")
+            except (OSError, ValueError):
+                # Fichier supprimé ou corrompu : on oublie l'entrée
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return array
+
+    def put(self, text, fingerprint, array):
+        """Enregistre la matrice d'embeddings d'une phrase puis applique l'éviction."""
+        key = self._key(text, fingerprint)
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        file_name = f"{key}.npy"
+        path = os.path.join(self.directory, file_name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, file, n_tokens, dim, nbytes, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, file_name, array.shape[0], array.shape[1], array.nbytes, time.time()),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, file_name, nbytes in self._db.execute(
+            "SELECT key, file, nbytes FROM entries ORDER BY last_access"
+        ).fetchall():
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except OSError:
+                pass
+            total -= nbytes
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        """Statistiques du cache : hits, misses, taux de succès, nombre d'entrées et taille."""
+        with self._lock:
+            entries, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def embed_with_cache(sentences, embeddings, cache):
+    """
+    Remplit les embeddings de tokens des phrases depuis le cache, calcule les manquants
+    avec `embeddings` et les enregistre.
+
+    Les modèles Flair ne recalculent pas un embedding déjà présent sur un token (même nom),
+    donc un predict() lancé ensuite réutilise directement les valeurs du cache.
+
+    Args:
+        sentences (list): Les Sentence Flair à embarquer.
+        embeddings: La pile de TokenEmbeddings du modèle (ex: tagger.embeddings).
+        cache (EmbeddingCache): Le cache à consulter.
+    """
+    import torch
+    from joint_inference import token_embedding_leaves
+
+    leaves = token_embedding_leaves(embeddings)
+    names = [leaf.name for leaf in leaves]
+    dims = [leaf.embedding_length for leaf in leaves]
+    fingerprint = stack_fingerprint(leaves)
+
+    missing = []
+    for sentence in sentences:
+        if len(sentence) == 0 or all(name in sentence[0]._embeddings for name in names):
+            continue
+        text = sentence.to_original_text()
+        array = cache.get(text, fingerprint)
+        if array is None or array.shape != (len(sentence), sum(dims)):
+            missing.append(sentence)
+            continue
+
+        tensor = torch.from_numpy(np.array(array))
+        for i, token in enumerate(sentence):
+            offset = 0
+            for name, dim in zip(names, dims):
+                token.set_embedding(name, tensor[i, offset:offset + dim])
+                offset += dim
+
+    if not missing:
+        return
+
+    embeddings.embed(missing)
+    for sentence in missing:
+        rows = [
+            torch.cat([token.get_embedding([name]) for name in names]).detach().cpu()
+            for token in sentence
+        ]
+        cache.put(sentence.to_original_text(), fingerprint, torch.stack(rows).numpy())
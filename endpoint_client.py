@@ -0,0 +1,385 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# DBpedia SPARQL endpoint URL
+DBPEDIA_ENDPOINT = "https://dbpedia.org/sparql"
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5     # secondes
+DEFAULT_READ_TIMEOUT = 30       # secondes
+# Délai d'exécution demandé au serveur (paramètre "timeout" de Virtuoso, en millisecondes),
+# sous le délai de lecture pour que le serveur abandonne la requête avant le client
+DEFAULT_SERVER_TIMEOUT = 10000
+# Au-delà, la requête est envoyée en POST pour ne pas dépasser la longueur d'URL du serveur
+MAX_GET_QUERY_LENGTH = 2000
+
+# Requêtes dupliquées sur le miroir suivant au-delà de ce percentile des latences observées
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_HEDGE_DELAY = 2.0       # secondes, tant qu'il n'y a pas assez de mesures
+MIN_LATENCY_SAMPLES = 20
+# Circuit ouvert après ce nombre d'échecs consécutifs, puis une requête d'essai après le délai
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30      # secondes
+
+class SparqlEndpointError(Exception):
+    """Erreur réseau ou HTTP renvoyée par un endpoint SPARQL (status : code HTTP, None si réseau)."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def endpoint_failure(self):
+        """Vrai si l'endpoint est en cause (réseau, 5xx, 429) et pas la requête elle-même."""
+        return self.status is None or self.status >= 500 or self.status == 429
+
+class EndpointClient:
+    """
+    Client HTTP partagé pour un endpoint SPARQL.
+
+    Une seule requests.Session garde un pool de connexions keep-alive (pas de nouvelle
+    poignée de main TCP/TLS par requête) et demande des réponses compressées en gzip.
+    La session peut être utilisée depuis plusieurs threads.
+    """
+
+    def __init__(self, endpoint=DBPEDIA_ENDPOINT, pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT, retries=0,
+                 server_timeout=DEFAULT_SERVER_TIMEOUT):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.endpoint = endpoint
+        self.timeout = (connect_timeout, read_timeout)
+        self.server_timeout = server_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Accept": "application/sparql-results+json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+    def query(self, query, params=None):
+        """
+        Exécute une requête SPARQL et retourne la réponse JSON décodée.
+
+        Args:
+            query (str): La requête SPARQL.
+            params (dict, optional): Paramètres supplémentaires propres à l'endpoint.
+
+        Returns:
+            dict: Le JSON de résultats SPARQL (bindings ou booléen).
+
+        Raises:
+            SparqlEndpointError: En cas d'erreur réseau, HTTP ou de réponse non JSON.
+        """
+        import requests
+
+        data = {"query": query, "format": "json"}
+        if self.server_timeout:
+            data["timeout"] = self.server_timeout
+        if params:
+            data.update(params)
+        try:
+            if len(query) > MAX_GET_QUERY_LENGTH:
+                response = self.session.post(self.endpoint, data=data, timeout=self.timeout)
+            else:
+                response = self.session.get(self.endpoint, params=data, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise SparqlEndpointError(str(e)) from e
+
+        if response.status_code >= 400:
+            # Virtuoso renvoie le détail de l'erreur (ex: erreur de syntaxe) dans le corps
+            body = " ".join(response.text.split())[:500]
+            raise SparqlEndpointError(f"HTTP {response.status_code} {response.reason}: {body}", response.status_code)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise SparqlEndpointError(f"Invalid JSON response: {e}") from e
+
+    def stream_query(self, query, params=None, chunk_size=64 * 1024):
+        """
+        Exécute une requête SELECT et renvoie ses bindings au fil de la lecture de la
+        réponse (json_stream.iter_json_bindings), sans charger le JSON complet.
+
+        Yields:
+            dict: Un binding SPARQL.
+
+        Raises:
+            SparqlEndpointError: En cas d'erreur réseau, HTTP ou de réponse invalide.
+        """
+        import requests
+        from json_stream import iter_json_bindings
+
+        data = {"query": query, "format": "json"}
+        if self.server_timeout:
+            data["timeout"] = self.server_timeout
+        if params:
+            data.update(params)
+        try:
+            if len(query) > MAX_GET_QUERY_LENGTH:
+                response = self.session.post(self.endpoint, data=data, timeout=self.timeout, stream=True)
+            else:
+                response = self.session.get(self.endpoint, params=data, timeout=self.timeout, stream=True)
+        except requests.RequestException as e:
+            raise SparqlEndpointError(str(e)) from e
+
+        with response:
+            if response.status_code >= 400:
+                body = " ".join(response.text.split())[:500]
+                raise SparqlEndpointError(f"HTTP {response.status_code} {response.reason}: {body}", response.status_code)
+            response.encoding = response.encoding or "utf-8"
+            try:
+                yield from iter_json_bindings(response.iter_content(chunk_size, decode_unicode=True))
+            except requests.RequestException as e:
+                raise SparqlEndpointError(str(e)) from e
+            except ValueError as e:
+                raise SparqlEndpointError(f"Invalid JSON response: {e}") from e
+
+    def close(self):
+        self.session.close()
+
+class CircuitBreaker:
+    """
+    Coupe-circuit d'un endpoint : ouvert après failure_threshold échecs consécutifs,
+    il laisse passer une seule requête d'essai après reset_timeout secondes (semi-ouvert)
+    et se referme au premier succès.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def acquire(self):
+        """
+        Autorise une requête : "closed" (circuit fermé), "probe" (requête d'essai réservée,
+        à rendre avec release() si elle n'est finalement pas envoyée) ou None (refusée).
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return "closed"
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return "probe"
+            return None
+
+    def allow(self):
+        """Indique si une requête peut être envoyée (et réserve la requête d'essai)."""
+        return self.acquire() is not None
+
+    def release(self):
+        """Rend la requête d'essai réservée par acquire() quand elle n'a finalement pas été envoyée."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+class LatencyTracker:
+    """Fenêtre glissante des latences des requêtes réussies."""
+
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p, default=None):
+        with self._lock:
+            samples = sorted(self.samples)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return default
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+class MultiEndpointClient:
+    """
+    Client SPARQL sur une liste ordonnée de miroirs, avec la même interface que EndpointClient.
+
+    - la requête part vers le premier miroir disponible ; si elle n'a pas répondu après
+      le percentile hedge_percentile des latences observées, un doublon part vers le
+      miroir suivant et la première réponse gagne ;
+    - une erreur réseau ou serveur fait passer immédiatement au miroir suivant ;
+      une erreur due à la requête (4xx) est renvoyée telle quelle ;
+    - chaque miroir a son coupe-circuit : un miroir qui échoue en boucle est ignoré
+      jusqu'à sa requête d'essai.
+    """
+
+    def __init__(self, endpoints, hedge_percentile=DEFAULT_HEDGE_PERCENTILE, hedge_delay=DEFAULT_HEDGE_DELAY,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 pool_size=DEFAULT_POOL_SIZE, **options):
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        self.clients = [EndpointClient(endpoint, pool_size=pool_size, **options) for endpoint in endpoints]
+        self.breakers = [CircuitBreaker(failure_threshold, reset_timeout) for _ in endpoints]
+        self.latencies = LatencyTracker()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.endpoint = self.clients[0].endpoint
+        self._executor = ThreadPoolExecutor(max_workers=pool_size * len(self.clients),
+                                            thread_name_prefix="sparql-endpoint")
+
+    def _timed_query(self, index, query, params):
+        start = time.monotonic()
+        try:
+            result = self.clients[index].query(query, params)
+        except SparqlEndpointError as e:
+            if e.endpoint_failure:
+                self.breakers[index].record_failure()
+            else:
+                self.breakers[index].record_success()
+            raise
+        self.breakers[index].record_success()
+        self.latencies.record(time.monotonic() - start)
+        return result
+
+    def query(self, query, params=None):
+        """
+        Exécute une requête SPARQL sur le miroir le plus rapide disponible.
+
+        Raises:
+            SparqlEndpointError: Erreur de la requête (4xx) ou échec de tous les miroirs.
+        """
+        pending = {}
+        errors = []
+        remaining = iter(range(len(self.clients)))
+
+        def launch():
+            """Envoie la requête au prochain miroir disponible (False s'il n'y en a plus)."""
+            for index in remaining:
+                # La requête d'essai d'un miroir semi-ouvert n'est réservée qu'au lancement
+                grant = self.breakers[index].acquire()
+                if grant is not None:
+                    pending[self._executor.submit(self._timed_query, index, query, params)] = (index, grant)
+                    return True
+            return False
+
+        if not launch():
+            raise SparqlEndpointError("All SPARQL endpoints are unavailable (circuit open)")
+        exhausted = False
+        try:
+            while pending:
+                delay = None
+                if not exhausted:
+                    delay = self.latencies.percentile(self.hedge_percentile, self.hedge_delay)
+                done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Trop lent : requête dupliquée sur le miroir suivant
+                    exhausted = not launch()
+                    continue
+                for future in done:
+                    index, _ = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except SparqlEndpointError as e:
+                        if not e.endpoint_failure:
+                            raise
+                        errors.append(f"{self.clients[index].endpoint}: {e}")
+                        if not exhausted:
+                            exhausted = not launch()
+                        continue
+                    # Les requêtes encore en cours finissent en arrière-plan (résultat ignoré)
+                    return result
+            raise SparqlEndpointError("; ".join(errors))
+        finally:
+            for future, (index, grant) in pending.items():
+                if future.cancel() and grant == "probe":
+                    # Jamais exécutée : la requête d'essai réservée est rendue
+                    self.breakers[index].release()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for client in self.clients:
+            client.close()
+
+_default_client = None
+_default_lock = threading.Lock()
+
+def configure_client(**options):
+    """
+    Remplace le client partagé (endpoint, pool_size, connect_timeout, read_timeout, retries, server_timeout).
+
+    Returns:
+        EndpointClient: Le nouveau client.
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = EndpointClient(**options)
+        return _default_client
+
+def get_default_client():
+    """Retourne le client partagé par tout le processus (créé au premier appel)."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = EndpointClient()
+        return _default_client
+
+def configure_endpoint(endpoint, **options):
+    """
+    Choisit le backend du client partagé à partir d'une chaîne de configuration (--endpoint).
+
+    - URL http(s) : endpoint SPARQL distant (options : voir configure_client) ;
+      plusieurs URLs séparées par des virgules : miroirs par ordre de préférence
+      (MultiEndpointClient, options : voir sa signature) ;
+    - "local:fichier.nt,fichier.ttl" : graphe en mémoire (local_store.LocalTripleStore),
+      un fichier .pickle étant un graphe déjà chargé et sauvegardé. Le cache de résultats
+      est alors désactivé : il est indexé par requête seule et mélangerait les backends.
+
+    Returns:
+        Le nouveau client (EndpointClient, MultiEndpointClient ou LocalTripleStore).
+    """
+    global _default_client
+    if endpoint.startswith(("http://", "https://")):
+        endpoints = [url.strip() for url in endpoint.split(",") if url.strip()]
+        if len(endpoints) == 1:
+            return configure_client(endpoint=endpoints[0], **options)
+        client = MultiEndpointClient(endpoints, **options)
+    else:
+        client = _local_store(endpoint)
+
+    with _default_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = client
+    return client
+
+def _local_store(endpoint):
+    from local_store import LocalTripleStore, LOCAL_ENDPOINT_SCHEME
+    from sparql_cache import configure_result_cache
+
+    if endpoint.startswith(LOCAL_ENDPOINT_SCHEME):
+        endpoint = endpoint[len(LOCAL_ENDPOINT_SCHEME):]
+    paths = [path for path in endpoint.split(",") if path]
+    pickles = [path for path in paths if path.endswith((".pickle", ".pkl"))]
+    sources = [path for path in paths if path not in pickles]
+    client = LocalTripleStore(sources, store_path=pickles[0] if pickles else None)
+    configure_result_cache(None)
+    return client
@@ -1,32 +1,62 @@
-from flair.data import Sentence
-from flair.models import SequenceTagger
+from model_registry import get_tagger
 
-def tag_entities_with_bilstm(model_path, questions):
+def tag_entities_with_bilstm(model_path, questions, embedding_cache=None):
     """
     Applique un modèle BiLSTM-CRF Flair à une liste de questions et retourne l'annotation token/tag.
+    Le modèle est obtenu via le registre de modèles : il n'est chargé qu'une fois par processus.
     
     Args:
         model_path (str): Chemin vers le modèle entraîné (.pt).
         questions (list): Liste de chaînes de questions.
+        embedding_cache (EmbeddingCache, optional): Cache disque des embeddings de tokens.
         
     Returns:
         dict: Un dictionnaire avec la question en clé et la liste des (token, tag) en valeur.
     """
-    model = SequenceTagger.load(model_path)
-    results = {}
+    model = get_tagger(model_path)
+    return tag_entities(model, questions, embedding_cache=embedding_cache)
 
-    for question in questions:
-        sentence = Sentence(question)
-        model.predict(sentence)
-        token_tags = []
+def tag_entities(model, questions, mini_batch_size=32, embedding_cache=None):
+    """
+    Applique un SequenceTagger déjà chargé à une liste de questions.
+    Toutes les phrases sont passées en une fois à model.predict, qui les traite par mini-batchs.
 
-        for token in sentence:
-            label = token.get_labels(model.tag_type)[0].value if token.get_labels(model.tag_type) else "O"
-            token_tags.append((token.text, label))
+    Args:
+        model (SequenceTagger): Le modèle BiLSTM-CRF chargé.
+        questions (list): Liste de chaînes de questions.
+        mini_batch_size (int): Taille des mini-batchs Flair.
+        embedding_cache (EmbeddingCache, optional): Cache disque des embeddings de tokens.
 
-        results[question] = token_tags
+    Returns:
+        dict: Un dictionnaire avec la question en clé et la liste des (token, tag) en valeur.
+    """
+    from flair.data import Sentence
+
+    results = {}
+    sentences = [Sentence(question) for question in questions]
+    if sentences:
+        if embedding_cache is not None:
+            from embedding_cache import embed_with_cache
+            embed_with_cache(sentences, model.embeddings, embedding_cache)
+        model.predict(sentences, mini_batch_size=mini_batch_size)
+
+    for question, sentence in zip(questions, sentences):
+        results[question] = extract_token_tags(sentence, model.tag_type)
 
     return results
+
+def extract_token_tags(sentence, tag_type):
+    """
+    Lit les tags prédits sur une Sentence Flair déjà annotée.
+
+    Returns:
+        list: La liste des (token, tag), "O" pour les tokens sans label.
+    """
+    token_tags = []
+    for token in sentence:
+        labels = token.get_labels(tag_type)
+        token_tags.append((token.text, labels[0].value if labels else "O"))
+    return token_tags
 '''
 results = tag_entities_with_bilstm("model/best-model.pt", ["Who is the CEO of Apple ?"])
 print(list(results.values())[0])
@@ -1,8 +1,4 @@
-import spacy
-from preprocessing_lemmatized import preprocess_question  # 📌 Importation du prétraitement
-
-# Charger le modèle Transformer de SpaCy
-nlp = spacy.load("en_core_web_trf")
+from preprocessing_lemmatized import preprocess_question, get_nlp  # 📌 Importation du prétraitement
 
 def detect_classes(preprocessed_data):
     """
@@ -18,7 +14,7 @@ def detect_classes(preprocessed_data):
 
     # Reconstruire la phrase pour SpaCy
     sentence = " ".join(tokens)
-    doc = nlp(sentence)  # Analyse avec le modèle Transformer
+    doc = get_nlp()(sentence)  # Analyse avec le modèle Transformer
 
     for i, token in enumerate(doc):
         tag = "O"  # Par défaut, "O"
@@ -48,24 +44,25 @@ def detect_classes(preprocessed_data):
 
     return classification, grouped_classes
 
-# 📌 Exemple de questions pour tester
-questions = [
-    "Which city is the capital of France?",
-    "Who is the president of the United States?",
-    "What is the largest company in the world?",
-    "Which movie won an Oscar in 2020?",
-    "Who is the author of The Catcher in the Rye?",
-    "Which scientist developed the theory of relativity?",
-    "What is the most famous painting by Leonardo da Vinci?",
-    "What video game was created by Nintendo?",
-]
+if __name__ == "__main__":
+    # 📌 Exemple de questions pour tester
+    questions = [
+        "Which city is the capital of France?",
+        "Who is the president of the United States?",
+        "What is the largest company in the world?",
+        "Which movie won an Oscar in 2020?",
+        "Who is the author of The Catcher in the Rye?",
+        "Which scientist developed the theory of relativity?",
+        "What is the most famous painting by Leonardo da Vinci?",
+        "What video game was created by Nintendo?",
+    ]
+
+    # 📌 Tester plusieurs questions
+    for question in questions:
+        preprocessed_output = preprocess_question(question)
+        classified_output, grouped_classes = detect_classes(preprocessed_output)
 
-# 📌 Tester plusieurs questions
-for question in questions:
-    preprocessed_output = preprocess_question(question)
-    classified_output, grouped_classes = detect_classes(preprocessed_output)
-    
-    print(f"\n📌 Détection des classes pour : \"{question}\"")
-    print("Classes détectées :", grouped_classes)
-    for token, tag in classified_output:
-        print(f"{token}: {tag}")
+        print(f"\n📌 Détection des classes pour : \"{question}\"")
+        print("Classes détectées :", grouped_classes)
+        for token, tag in classified_output:
+            print(f"{token}: {tag}")
@@ -1,8 +1,4 @@
-import spacy
-from preprocessing_lemmatized import preprocess_question  # 📌 Importation du prétraitement
-
-# Charger le modèle Transformer de SpaCy
-nlp = spacy.load("en_core_web_trf")
+from preprocessing_lemmatized import preprocess_question, get_nlp  # 📌 Importation du prétraitement
 
 def detect_relations(preprocessed_data):
     """
@@ -18,7 +14,7 @@ def detect_relations(preprocessed_data):
 
     # Reconstruire la phrase pour SpaCy
     sentence = " ".join(tokens)
-    doc = nlp(sentence)  # Analyse avec le modèle Transformer
+    doc = get_nlp()(sentence)  # Analyse avec le modèle Transformer
 
     for i, token in enumerate(doc):
         tag = "O"  # Par défaut, "O"
@@ -55,24 +51,25 @@ def detect_relations(preprocessed_data):
 
     return classification, grouped_relations
 
-# 📌 Exemple de questions pour tester
-questions = [
-    "Who wrote Hamlet?",
-    "What is the capital of France?",
-    "Who is the father of Barack Obama?",
-    "Who is the CEO of Apple?",
-    "Who directed the movie Titanic?",
-    "Who invented the telephone?",
-    "What is the currency used in Canada?",
-    "Who painted the Mona Lisa?",
-]
+if __name__ == "__main__":
+    # 📌 Exemple de questions pour tester
+    questions = [
+        "Who wrote Hamlet?",
+        "What is the capital of France?",
+        "Who is the father of Barack Obama?",
+        "Who is the CEO of Apple?",
+        "Who directed the movie Titanic?",
+        "Who invented the telephone?",
+        "What is the currency used in Canada?",
+        "Who painted the Mona Lisa?",
+    ]
+
+    # 📌 Tester plusieurs questions
+    for question in questions:
+        preprocessed_output = preprocess_question(question)
+        classified_output, grouped_relations = detect_relations(preprocessed_output)
 
-# 📌 Tester plusieurs questions
-for question in questions:
-    preprocessed_output = preprocess_question(question)
-    classified_output, grouped_relations = detect_relations(preprocessed_output)
-    
-    print(f"\n📌 Détection des relations pour : \"{question}\"")
-    print("Relations détectées :", grouped_relations)
-    for token, tag in classified_output:
-        print(f"{token}: {tag}")
+        print(f"\n📌 Détection des relations pour : \"{question}\"")
+        print("Relations détectées :", grouped_relations)
+        for token, tag in classified_output:
+            print(f"{token}: {tag}")
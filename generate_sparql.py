@@ -1,7 +1,18 @@
 import json
 import sys
-import os
-import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from sparql_templates import get_template, load_templates, TEMPLATE_MAP_FILE
+from json_stream import iter_json_file
+
+QUESTIONS_FILE = 'mapped_classified_questions.json'
+# Questions per work unit sent to a worker process
+DEFAULT_CHUNK_SIZE = 500
+
+# Template map of a worker process (see _init_worker)
+_worker_templates = None
 
 def load_json_file(file_path):
     """Load a JSON file and return its contents."""
@@ -47,8 +58,23 @@ def generate_sparql_query(question_index, questions, templates):
     if question_index < 0 or question_index >= len(questions):
         return f"Error: Index {question_index} is out of range. Valid range: 0-{len(questions)-1}"
     
+    return generate_sparql_for_question(questions[question_index], templates)
+
+def generate_sparql_for_question(question_data, templates):
+    """
+    Generate a SPARQL query for one question of mapped_classified_questions.json.
+    
+    The template is filled through its compiled form (sparql_templates.py): entities
+    and ranked predicates go into its slots, whatever the template.
+    
+    Args:
+        question_data (dict): The question with its template_id and mapping
+        templates (dict): The template map, compiled (sparql_templates.load_templates) or raw
+    
+    Returns:
+        dict: The question, template, query and mappings (or an error string)
+    """
     # Get the question and its mappings
-    question_data = questions[question_index]
     template_id = question_data.get('template_id')
     mappings = question_data.get('mapping', {})
     
@@ -59,238 +85,8 @@ def generate_sparql_query(question_index, questions, templates):
     if template_id not in templates:
         return f"Error: Template ID '{template_id}' not found in the template map."
     
-    # Get the SPARQL template
-    template = templates[template_id]['sparql_template']
-    
-    # Define low-priority predicates (common but often not semantically meaningful)
-    low_priority_predicates = ['is', 'was', 'are', 'were', 'does', 'did', 'has', 'have', 'had', 'in', 'on', 'at', 'by', 'to', 'for']
-    
-    # Process based on template type
-    if template_id == 'A':
-        # Template A: (S, P, ?ans)
-        # Replace <S> and <P> with their corresponding values
-        entity = None
-        predicate = None
-        
-        # First, identify the entity (S) from mappings
-        for key, value in mappings.items():
-            if value.startswith('dbr:'):
-                entity = value
-                break
-        
-        # Create a dictionary to store predicate candidates and their priorities
-        predicate_candidates = {}
-        
-        # Next, identify potential predicates and set their priority
-        question_lower = question_data['question'].lower()
-        
-        # Scan all predicates and rate them
-        for key, value in mappings.items():
-            if not value.startswith('dbo:'):
-                continue
-                
-            # Extract the predicate name without prefix
-            pred_name = value[4:].lower()
-            
-            # Skip if the predicate is in the low priority list
-            if pred_name.lower() in low_priority_predicates:
-                predicate_candidates[value] = 1  # Lowest priority
-                continue
-            
-            # Check for common question patterns and assign priorities
-            priority = 2  # Default priority
-            
-            # Birth year questions
-            if ("born" in question_lower or "birth" in question_lower) and ("year" in question_lower):
-                if "birth" in key.lower() or "born" in key.lower() or "year" in key.lower():
-                    priority = 10
-                    if key.lower() == "birthyear" or key.lower() == "birth year":
-                        priority = 15  # Highest priority
-                
-            # Death year questions
-            elif ("die" in question_lower or "death" in question_lower) and ("year" in question_lower):
-                if "death" in key.lower() or "die" in key.lower() or "year" in key.lower():
-                    priority = 10
-                    if key.lower() == "deathyear" or key.lower() == "death year":
-                        priority = 15  # Highest priority
-                        
-            # Location questions
-            elif any(loc in question_lower for loc in ["where", "location", "place"]):
-                if any(loc in key.lower() for loc in ["location", "place", "country", "city"]):
-                    priority = 10
-            
-            # Author questions
-            elif any(auth in question_lower for auth in ["who wrote", "author", "writer"]):
-                if any(auth in key.lower() for auth in ["author", "writer", "wrote"]):
-                    priority = 10
-            
-            # Creation date questions
-            elif any(date in question_lower for date in ["when", "date", "year"]) and any(create in question_lower for create in ["create", "found", "establish"]):
-                if any(date in key.lower() for date in ["date", "year", "found", "establish", "create"]):
-                    priority = 10
-            
-            # Currency questions
-            elif "currency" in question_lower:
-                if "currency" in key.lower():
-                    priority = 15
-            
-            # Specific semantic actions
-            relevant_actions = ["start", "end", "direct", "write", "compose", "invent", "discover", "marry", "spouse", "starring", "actor", "actress"]
-            for action in relevant_actions:
-                if action in question_lower and action in key.lower():
-                    priority = 10
-                    break
-            
-            # Store the predicate with its priority
-            predicate_candidates[value] = priority
-        
-        # Select the predicate with the highest priority
-        if predicate_candidates:
-            predicate = max(predicate_candidates.items(), key=lambda x: x[1])[0]
-        
-        # Apply the substitutions
-        query = template.replace('dbr:<S>', entity if entity else 'ERROR_MISSING_ENTITY')
-        query = query.replace('dbo:<P>', predicate if predicate else 'ERROR_MISSING_PREDICATE')
-    
-    elif template_id == 'B':
-        # Template B: (?ans, P, O)
-        predicate = None
-        object_val = None
-        
-        # First, find the object (O) entity in the mappings
-        for key, value in mappings.items():
-            if value.startswith('dbr:'):
-                object_val = value
-                break
-        
-        # Create a dictionary to store predicate candidates and their priorities
-        predicate_candidates = {}
-        
-        # Process predicates
-        question_lower = question_data['question'].lower()
-        
-        for key, value in mappings.items():
-            if not value.startswith('dbo:'):
-                continue
-                
-            # Extract the predicate name without prefix
-            pred_name = value[4:].lower()
-            
-            # Skip if the predicate is in the low priority list
-            if pred_name.lower() in low_priority_predicates:
-                predicate_candidates[value] = 1  # Lowest priority
-                continue
-            
-            # Check for common question patterns for B template
-            priority = 2  # Default priority
-            
-            # Actor/Actress questions
-            if any(actor in question_lower for actor in ["actor", "actress", "star", "cast"]):
-                if any(act in key.lower() for act in ["actor", "actress", "star", "cast"]):
-                    priority = 10
-            
-            # Author/Writer questions
-            elif any(writer in question_lower for writer in ["author", "writer", "wrote"]):
-                if any(write in key.lower() for write in ["author", "writer", "wrote"]):
-                    priority = 10
-            
-            # Director questions
-            elif "director" in question_lower:
-                if "direct" in key.lower():
-                    priority = 10
-            
-            # Other relationships
-            relevant_actions = ["spouse", "marry", "child", "parent", "discover", "invent", "found", "create", "currency"]
-            for action in relevant_actions:
-                if action in question_lower and action in key.lower():
-                    priority = 10
-                    break
-            
-            # Store the predicate with its priority
-            predicate_candidates[value] = priority
-        
-        # Select the predicate with the highest priority
-        if predicate_candidates:
-            predicate = max(predicate_candidates.items(), key=lambda x: x[1])[0]
-        
-        # Apply the substitutions
-        query = template.replace('dbo:<P>', predicate if predicate else 'ERROR_MISSING_PREDICATE')
-        query = query.replace('dbr:<O>', object_val if object_val else 'ERROR_MISSING_OBJECT')
-    
-    elif template_id == 'D':
-        # Template D: (S, P, O)
-        subject = None
-        predicate = None
-        object_val = None
-        
-        # Find entities in the mappings (subject and object)
-        entities = [value for key, value in mappings.items() if value.startswith('dbr:')]
-        if len(entities) >= 1:
-            subject = entities[0]
-        if len(entities) >= 2:
-            object_val = entities[1]
-        
-        # Create a dictionary to store predicate candidates and their priorities
-        predicate_candidates = {}
-        
-        # Process predicates
-        question_lower = question_data['question'].lower()
-        
-        for key, value in mappings.items():
-            if not value.startswith('dbo:'):
-                continue
-                
-            # Extract the predicate name without prefix
-            pred_name = value[4:].lower()
-            
-            # Skip if the predicate is in the low priority list
-            if pred_name.lower() in low_priority_predicates:
-                predicate_candidates[value] = 1  # Lowest priority
-                continue
-            
-            # Check for common question patterns for D template
-            priority = 2  # Default priority
-            
-            # Relationship questions
-            if any(rel in question_lower for rel in ["spouse", "married", "husband", "wife"]):
-                if any(rel in key.lower() for rel in ["spouse", "married", "husband", "wife"]):
-                    priority = 10
-            
-            # Parent/Child questions
-            elif any(rel in question_lower for rel in ["parent", "child", "son", "daughter", "father", "mother"]):
-                if any(rel in key.lower() for rel in ["parent", "child", "son", "daughter", "father", "mother"]):
-                    priority = 10
-            
-            # Currency questions
-            elif "currency" in question_lower:
-                if "currency" in key.lower():
-                    priority = 15
-            
-            # Other specific relationships
-            relevant_actions = ["direct", "create", "write", "compose", "discover", "invent", "found"]
-            for action in relevant_actions:
-                if action in question_lower and action in key.lower():
-                    priority = 10
-                    break
-            
-            # Store the predicate with its priority
-            predicate_candidates[value] = priority
-        
-        # Select the predicate with the highest priority
-        if predicate_candidates:
-            predicate = max(predicate_candidates.items(), key=lambda x: x[1])[0]
-        
-        # Apply the substitutions
-        query = template.replace('dbr:<S>', subject if subject else 'ERROR_MISSING_SUBJECT')
-        query = query.replace('dbo:<P>', predicate if predicate else 'ERROR_MISSING_PREDICATE')
-        query = query.replace('dbr:<O>', object_val if object_val else 'ERROR_MISSING_OBJECT')
-    
-    else:
-        return {
-            "question": question_data["question"],
-            "template_id": template_id,
-            "error": f"Unknown template ID '{template_id}'"
-        }
+    # Fill the entity and predicate slots of the compiled template
+    query = get_template(templates, template_id).fill(question_data['question'], mappings)
     
     return {
         "question": question_data["question"],
@@ -300,23 +96,111 @@ def generate_sparql_query(question_index, questions, templates):
         "predicate_mappings": {k: v for k, v in mappings.items() if v.startswith('dbo:')}
     }
 
-def process_all_questions(output_file=None, verbose=False):
-    """Process all questions and optionally save results to a file."""
-    # Load the template map and questions
-    templates = load_json_file('template_map.json')
-    questions = load_json_file('mapped_classified_questions.json')
+def iter_questions(file_path):
+    """
+    Iterate over the questions of a JSON array file or a JSONL file (one question per
+    line) without loading the whole file.
+    """
+    if file_path.endswith('.jsonl'):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from iter_json_file(file_path)
+
+def _init_worker(templates):
+    """Keep the template map in each worker process (sent once, not with every chunk)."""
+    global _worker_templates
+    _worker_templates = templates
+
+def _generate_chunk(chunk):
+    return [generate_sparql_for_question(question_data, _worker_templates) for question_data in chunk]
+
+def generate_all(questions, templates, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Generate the queries of a stream of questions, in input order.
     
-    results = []
-    total_questions = len(questions)
+    With several workers, the questions are sent to a process pool in chunks of
+    chunk_size. At most 2 * workers chunks are in flight, so memory stays constant
+    whatever the number of questions.
+    
+    Args:
+        questions (iterable): Question dicts (see iter_questions)
+        templates (dict): The loaded template map
+        workers (int): Number of processes (1 = in this process)
+        chunk_size (int): Number of questions per work unit
+    
+    Yields:
+        The result of generate_sparql_for_question for each question
+    """
+    if workers <= 1:
+        for question_data in questions:
+            yield generate_sparql_for_question(question_data, templates)
+        return
+    
+    questions = iter(questions)
+    in_flight = deque()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(templates,))
+    try:
+        while True:
+            chunk = list(islice(questions, chunk_size))
+            if chunk:
+                in_flight.append(pool.submit(_generate_chunk, chunk))
+            if in_flight and (not chunk or len(in_flight) >= 2 * workers):
+                # The oldest chunk first: results stay in input order
+                yield from in_flight.popleft().result()
+            elif not chunk:
+                break
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def process_all_questions(output_file=None, verbose=False, workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+                          questions_file=QUESTIONS_FILE):
+    """
+    Process all questions and optionally save results to a file.
     
-    print(f"Processing {total_questions} questions...")
+    The questions are read incrementally. With a .jsonl output_file, each result is
+    written as soon as it is generated (in input order) and nothing is kept in memory.
+    Otherwise the results are returned and saved as one JSON array.
     
-    for i, _ in enumerate(questions):
-        result = generate_sparql_query(i, questions, templates)
-        results.append(result)
-        
-        if verbose and (i % 100 == 0 or i == total_questions - 1):
-            print(f"Processed {i+1}/{total_questions} questions")
+    Args:
+        output_file (str, optional): Output file (.json array or .jsonl stream)
+        verbose (bool): Print the progress every 100 questions
+        workers (int): Number of processes generating the queries
+        chunk_size (int): Number of questions sent to a process at once
+        questions_file (str): Questions file (.json array or .jsonl)
+    
+    Returns:
+        list: The results, or the number of questions processed in .jsonl mode
+    """
+    # Load the compiled template map, the questions are streamed
+    templates = load_templates(TEMPLATE_MAP_FILE)
+    streaming = bool(output_file) and output_file.endswith('.jsonl')
+    
+    print(f"Processing questions from {questions_file} ({workers} worker(s))...")
+    
+    results = []
+    count = 0
+    out = open(output_file, 'w', encoding='utf-8') if streaming else None
+    try:
+        for result in generate_all(iter_questions(questions_file), templates, workers, chunk_size):
+            if streaming:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            else:
+                results.append(result)
+            count += 1
+            
+            if verbose and count % 100 == 0:
+                print(f"Processed {count} questions")
+    finally:
+        if out is not None:
+            out.close()
+    print(f"Processed {count} questions")
+    
+    if streaming:
+        print(f"Results saved to {output_file}")
+        return count
     
     # Save to file if requested
     if output_file:
@@ -332,50 +216,75 @@ def main():
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python generate_sparql.py <question_index>")
-        print("  python generate_sparql.py all [output_file.json] [--verbose]")
+        print("  python generate_sparql.py all [output_file.json|.jsonl] [--verbose] [--workers N] [--chunk-size N] [--questions FILE]")
         print("")
         print("Examples:")
         print("  python generate_sparql.py 0                   # Process question at index 0")
         print("  python generate_sparql.py all                 # Process all questions")
         print("  python generate_sparql.py all results.json    # Process all questions and save to results.json")
         print("  python generate_sparql.py all --verbose       # Process all questions with verbose output")
+        print("  python generate_sparql.py all results.jsonl --workers 8 --questions big.jsonl  # Stream a large corpus over 8 processes")
         sys.exit(1)
     
     try:
-        # Load the template map and questions
-        templates = load_json_file('template_map.json')
-        questions = load_json_file('mapped_classified_questions.json')
-        
         # Check if we're processing a single question or all questions
         if sys.argv[1].lower() == 'all':
             # Process all questions
             output_file = None
             verbose = False
+            workers = 1
+            chunk_size = DEFAULT_CHUNK_SIZE
+            questions_file = QUESTIONS_FILE
             
             # Check for additional arguments
-            if len(sys.argv) > 2:
-                for arg in sys.argv[2:]:
-                    if arg == '--verbose':
-                        verbose = True
-                    elif not arg.startswith('--'):
-                        output_file = arg
+            i = 2
+            while i < len(sys.argv):
+                arg = sys.argv[i]
+                if arg == '--verbose':
+                    verbose = True
+                elif arg == '--questions' and i + 1 < len(sys.argv):
+                    questions_file = sys.argv[i + 1]
+                    i += 1
+                elif arg in ('--workers', '--chunk-size') and i + 1 < len(sys.argv):
+                    if not sys.argv[i + 1].isdigit() or int(sys.argv[i + 1]) < 1:
+                        print(f"Error: {arg} must be a positive integer, got '{sys.argv[i + 1]}'")
+                        sys.exit(1)
+                    if arg == '--workers':
+                        workers = int(sys.argv[i + 1])
+                    else:
+                        chunk_size = int(sys.argv[i + 1])
+                    # The value is not the output file
+                    i += 1
+                elif not arg.startswith('--'):
+                    output_file = arg
+                i += 1
             
-            process_all_questions(output_file, verbose)
+            process_all_questions(output_file, verbose, workers, chunk_size, questions_file)
         else:
+            try:
+                question_index = int(sys.argv[1])
+            except ValueError:
+                print("Error: Question index must be an integer")
+                sys.exit(1)
+            
+            # Load the template map and questions
+            templates = load_templates(TEMPLATE_MAP_FILE)
+            questions = load_json_file(QUESTIONS_FILE)
+            
             # Process a single question
-            question_index = int(sys.argv[1])
             result = generate_sparql_query(question_index, questions, templates)
             print(json.dumps(result, indent=2))
     
-    except ValueError:
-        print("Error: Question index must be an integer")
-        sys.exit(1)
     except FileNotFoundError as e:
         print(f"Error: File not found - {str(e)}")
         sys.exit(1)
     except json.JSONDecodeError:
         print("Error: Invalid JSON format in one of the input files")
         sys.exit(1)
+    except ValueError as e:
+        # Malformed or truncated questions file (see json_stream)
+        print(f"Error: {str(e)}")
+        sys.exit(1)
     except Exception as e:
         print(f"Error: {str(e)}")
         sys.exit(1)
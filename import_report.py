@@ -0,0 +1,76 @@
+import argparse
+import subprocess
+import sys
+import time
+
+# Modules importés par le pipeline (main.py et ses dépendances directes)
+DEFAULT_MODULES = [
+    "main",
+    "sparql",
+    "sparql_utils",
+    "test_sparql_queries",
+    "generate_sparql",
+    "entity_type_tagging",
+    "classify_questions",
+    "entity_mapping",
+    "model_registry",
+]
+
+def measure_import(module_name):
+    """
+    Importe un module dans un interpréteur neuf avec `-X importtime`.
+
+    Args:
+        module_name (str): Nom du module à importer.
+
+    Returns:
+        dict: Temps total (ms), erreur éventuelle et liste des (cumulatif_us, self_us, module) importés.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    error = None
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+    return {"module": module_name, "wall_ms": wall_ms, "error": error, "entries": entries}
+
+def print_report(reports, top=10):
+    """Affiche le coût d'import de chaque module puis ses dépendances les plus lentes."""
+    print(f"{'Module':<25} {'Import (ms)':>12} {'Processus (ms)':>15}")
+    print("-" * 54)
+    for report in sorted(reports, key=lambda r: r["wall_ms"], reverse=True):
+        own = next((e for e in report["entries"] if e[2].strip() == report["module"]), None)
+        import_ms = f"{own[0] / 1000:.1f}" if own else "-"
+        print(f"{report['module']:<25} {import_ms:>12} {report['wall_ms']:>15.1f}")
+        if report["error"]:
+            print(f"    échec : {report['error']}")
+
+    for report in reports:
+        if not report["entries"] or top <= 0:
+            continue
+        print(f"\n{report['module']} : {top} imports les plus coûteux (cumulatif)")
+        for cumulative_us, self_us, name in sorted(report["entries"], reverse=True)[:top]:
+            print(f"  {cumulative_us / 1000:>9.1f} ms  (self {self_us / 1000:>7.1f} ms)  {name.strip()}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapport du temps d'import par module")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules à mesurer")
+    parser.add_argument("--top", type=int, default=10, help="Nombre de dépendances détaillées par module (0 pour aucune)")
+    args = parser.parse_args()
+
+    print_report([measure_import(module) for module in args.modules], args.top)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from classify_questions import extract_template, extract_template_confidence
+from entity_type_tagging import extract_token_tags
+
+def token_embedding_leaves(embeddings):
+    """
+    Aplatit des StackedEmbeddings (éventuellement imbriqués) en la liste de leurs
+    TokenEmbeddings élémentaires (glove, news-forward, news-backward...).
+    """
+    from flair.embeddings import StackedEmbeddings
+
+    if isinstance(embeddings, StackedEmbeddings):
+        leaves = []
+        for embedding in embeddings.embeddings:
+            leaves.extend(token_embedding_leaves(embedding))
+        return leaves
+    return [embeddings]
+
+def _same_weights(first, second):
+    """Vrai si deux embeddings ont le même nom et exactement les mêmes poids."""
+    import torch
+
+    if first.name != second.name:
+        return False
+    first_state, second_state = first.state_dict(), second.state_dict()
+    if first_state.keys() != second_state.keys():
+        return False
+    return all(torch.equal(first_state[k], second_state[k]) for k in first_state)
+
+def _replace_leaf(stack, old, new):
+    """Remplace `old` par `new` dans un StackedEmbeddings (liste et sous-modules torch)."""
+    from flair.embeddings import StackedEmbeddings
+
+    for i, embedding in enumerate(stack.embeddings):
+        if embedding is old:
+            stack.embeddings[i] = new
+            setattr(stack, f"list_embedding_{i}", new)
+        elif isinstance(embedding, StackedEmbeddings):
+            _replace_leaf(embedding, old, new)
+
+def share_embeddings(tagger, classifier):
+    """
+    Fait pointer les embeddings de mots du classifieur vers ceux du tagger.
+
+    Les deux modèles sont entraînés sur la même pile glove + news-forward + news-backward,
+    gelée pendant l'entraînement : une fois partagées, les copies du classifieur sont
+    libérées et chaque jeu de poids n'existe qu'une fois dans le processus. Seuls les
+    embeddings de même nom et de poids identiques sont partagés.
+
+    Args:
+        tagger (SequenceTagger): Le modèle BiLSTM-CRF.
+        classifier (TextClassifier): Le classifieur de templates (DocumentPoolEmbeddings).
+
+    Returns:
+        list: Les noms des embeddings partagés.
+    """
+    tagger_leaves = {leaf.name: leaf for leaf in token_embedding_leaves(tagger.embeddings)}
+    classifier_stack = classifier.embeddings.embeddings
+
+    shared = []
+    for leaf in token_embedding_leaves(classifier_stack):
+        twin = tagger_leaves.get(leaf.name)
+        if twin is None:
+            continue
+        if twin is leaf or _same_weights(twin, leaf):
+            _replace_leaf(classifier_stack, leaf, twin)
+            shared.append(leaf.name)
+    return shared
+
+def predict_joint(questions, tagger, classifier, mini_batch_size=32, embedding_cache=None):
+    """
+    Tagging et classification de template en calculant les embeddings une seule fois.
+
+    Le tagger tourne en premier en conservant les embeddings de tokens sur les phrases ;
+    le classifieur retrouve ensuite ces embeddings (même nom) au lieu de les recalculer,
+    puis les libère.
+
+    Args:
+        questions (list): Les questions en langage naturel.
+        tagger (SequenceTagger): Le modèle BiLSTM-CRF.
+        classifier (TextClassifier): Le classifieur de templates.
+        mini_batch_size (int): Taille des mini-batchs Flair.
+        embedding_cache (EmbeddingCache, optional): Cache disque consulté avant le calcul des embeddings.
+
+    Returns:
+        list: Pour chaque question, un tuple (liste des (token, tag), template prédit, score du template).
+    """
+    import flair
+    from flair.data import Sentence
+
+    sentences = [Sentence(question) for question in questions]
+    if not sentences:
+        return []
+
+    if embedding_cache is not None:
+        from embedding_cache import embed_with_cache
+        embed_with_cache(sentences, tagger.embeddings, embedding_cache)
+        # Ne calcule rien si les embeddings sont partagés avec le tagger
+        embed_with_cache(sentences, classifier.embeddings.embeddings, embedding_cache)
+
+    storage_mode = "gpu" if flair.device.type == "cuda" else "cpu"
+    tagger.predict(sentences, mini_batch_size=mini_batch_size, embedding_storage_mode=storage_mode)
+    classifier.predict(sentences, mini_batch_size=mini_batch_size, embedding_storage_mode="none")
+
+    return [(extract_token_tags(sentence, tagger.tag_type), extract_template(sentence), extract_template_confidence(sentence))
+            for sentence in sentences]
@@ -0,0 +1,72 @@
+import json
+import re
+
+_BINDINGS_RE = re.compile(r'"bindings"\s*:\s*\[')
+_ARRAY_RE = re.compile(r"\A\s*\[")
+_SKIP_RE = re.compile(r"[\s,]*")
+
+def _iter_array_items(chunks, start_re, missing_message):
+    """Éléments du tableau JSON qui suit la première correspondance de start_re, au fil des morceaux."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = None
+    for chunk in chunks:
+        buffer += chunk
+        if position is None:
+            match = start_re.search(buffer)
+            if match is None:
+                continue
+            position = match.end()
+
+        while True:
+            position = _SKIP_RE.match(buffer, position).end()
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Élément incomplet : attendre le morceau suivant
+                break
+            yield item
+            position = end
+
+        # Ne garder que la partie non encore analysée
+        buffer = buffer[position:]
+        position = 0
+
+    if position is None:
+        raise ValueError(missing_message)
+    raise ValueError("Truncated JSON document")
+
+def iter_json_bindings(chunks):
+    """
+    Parse incrémental d'une réponse SPARQL JSON : chaque binding de results.bindings est
+    renvoyé dès qu'il est complet, sans garder le document entier en mémoire.
+
+    Args:
+        chunks (iterable): Morceaux de texte successifs de la réponse.
+
+    Yields:
+        dict: Un binding ({variable: {"type", "value", ...}}).
+
+    Raises:
+        ValueError: Si la réponse est tronquée ou n'est pas du JSON valide.
+    """
+    return _iter_array_items(chunks, _BINDINGS_RE, "No results.bindings array in the response")
+
+def iter_json_array(chunks):
+    """
+    Parse incrémental d'un document JSON dont la racine est un tableau (fichiers de
+    questions, de résultats) : chaque élément est renvoyé dès qu'il est complet.
+
+    Raises:
+        ValueError: Si le document n'est pas un tableau, ou s'il est tronqué.
+    """
+    return _iter_array_items(chunks, _ARRAY_RE, "The JSON document is not an array")
+
+def iter_json_file(path, chunk_size=1 << 16):
+    """Éléments du tableau JSON d'un fichier, lu par morceaux de chunk_size caractères."""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_json_array(iter(lambda: f.read(chunk_size), ""))
@@ -0,0 +1,102 @@
+import json
+import os
+
+CHECKPOINT_SUFFIX = ".done"
+
+def read_jsonl(path):
+    """Itère sur les enregistrements d'un fichier JSONL (une ligne tronquée en fin de fichier est ignorée)."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Dernière ligne interrompue par un arrêt brutal
+                continue
+
+class JsonlCheckpoint:
+    """
+    Sortie JSONL reprenable d'un traitement par lots.
+
+    Chaque élément terminé est ajouté au fichier JSONL (s'il produit un enregistrement)
+    puis son index est noté dans le fichier de checkpoint `<path>.done`, les deux étant
+    vidés sur disque aussitôt : un arrêt (plantage, Ctrl-C) ne perd que les éléments en cours.
+
+    Avec resume=True, les index du checkpoint sont relus (voir `done`) et le JSONL est
+    réduit aux enregistrements de ces index : un enregistrement écrit sans que son index
+    ait été noté, ou une ligne tronquée, sont refaits. Les enregistrements repris peuvent
+    être relus avec read_jsonl(path). Sans resume, les deux fichiers sont réinitialisés.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.checkpoint_path = path + CHECKPOINT_SUFFIX
+        self.done = set()
+        if resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                # Une ligne sans retour à la ligne a été interrompue : l'index n'est pas sûr
+                self.done = {int(line) for line in f if line.endswith("\n") and line.strip().isdigit()}
+        if resume and os.path.exists(path):
+            # Réécriture en flux : seuls les enregistrements notés dans le checkpoint sont gardés
+            with open(path + ".tmp", "w", encoding="utf-8") as out:
+                for record in read_jsonl(path):
+                    if record.get("index") in self.done:
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(path + ".tmp", path)
+        self._out = open(path, "a" if resume else "w", encoding="utf-8")
+        self._checkpoint = open(self.checkpoint_path, "w", encoding="utf-8")
+        self._checkpoint.writelines(f"{index}\n" for index in sorted(self.done))
+        self._checkpoint.flush()
+
+    def write(self, index, record=None):
+        """Enregistre la fin de l'élément `index`, avec son enregistrement éventuel (qui doit porter "index")."""
+        if record is not None:
+            self._out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._out.flush()
+        self._checkpoint.write(f"{index}\n")
+        self._checkpoint.flush()
+        self.done.add(index)
+
+    def close(self):
+        self._out.close()
+        self._checkpoint.close()
+
+    def finish(self):
+        """Ferme les fichiers et supprime le checkpoint, une fois tous les éléments traités (le JSONL reste)."""
+        self.close()
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def remove(self):
+        """Supprime le JSONL et le checkpoint (une fois la sortie finale écrite)."""
+        self.close()
+        for path in (self.path, self.checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def jsonl_to_json(jsonl_path, json_path, keep=None):
+    """
+    Recopie un JSONL dans un tableau JSON indenté, enregistrement par enregistrement.
+
+    Args:
+        keep (callable, optional): Filtre des enregistrements à garder.
+
+    Returns:
+        int: Le nombre d'enregistrements écrits.
+    """
+    count = 0
+    with open(json_path, "w", encoding="utf-8") as out:
+        out.write("[")
+        for record in read_jsonl(jsonl_path):
+            if keep is not None and not keep(record):
+                continue
+            text = json.dumps(record, indent=2).replace("\n", "\n  ")
+            out.write(("," if count else "") + "\n  " + text)
+            count += 1
+        out.write("\n]" if count else "]")
+    return count
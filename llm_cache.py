@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+
+from sqlite_cache import SQLiteCache
+from answer_cache import normalize_question
+
+DEFAULT_LLM_CACHE_PATH = "llm_cache.sqlite"
+DEFAULT_LLM_CACHE_SIZE = 100000
+
+def cache_key(question, model, prompt_version):
+    """Clé du cache : version du prompt, modèle et question normalisée."""
+    return json.dumps([prompt_version, model, normalize_question(question)], ensure_ascii=False)
+
+class LLMCache:
+    """
+    Cache persistant des requêtes SPARQL générées par le LLM (sparql.generate_sparql_from_nlp).
+
+    Chaque entrée garde la réponse brute du modèle et la requête nettoyée. Changer de modèle
+    ou de PROMPT_VERSION change la clé : les anciennes entrées ne sont plus utilisées et
+    peuvent être invalidées. Pas de TTL par défaut : une complétion ne périme pas.
+    """
+
+    def __init__(self, path=DEFAULT_LLM_CACHE_PATH, ttl=None, max_entries=DEFAULT_LLM_CACHE_SIZE):
+        self.store = SQLiteCache(path, ttl=ttl, max_entries=max_entries, table="llm_completions")
+
+    def get(self, question, model, prompt_version):
+        """Retourne l'entrée {"question", "model", "prompt_version", "completion", "query", "created_at"} ou None."""
+        return self.store.get(cache_key(question, model, prompt_version))
+
+    def put(self, question, model, prompt_version, completion, query):
+        """Enregistre une complétion (les réponses vides, en erreur, ne sont pas gardées)."""
+        if not completion:
+            return
+        self.store.put(cache_key(question, model, prompt_version), {
+            "question": question,
+            "model": model,
+            "prompt_version": prompt_version,
+            "completion": completion,
+            "query": query,
+            "created_at": time.time(),
+        })
+
+    def entries(self, question=None, model=None, prompt_version=None):
+        """Entrées correspondant aux filtres donnés (toutes par défaut), par date d'ajout."""
+        wanted = normalize_question(question) if question else None
+        selected = []
+        for key, entry in self.store.items():
+            if wanted is not None and normalize_question(entry["question"]) != wanted:
+                continue
+            if model is not None and entry["model"] != model:
+                continue
+            if prompt_version is not None and entry["prompt_version"] != prompt_version:
+                continue
+            selected.append((key, entry))
+        return selected
+
+    def invalidate(self, question=None, model=None, prompt_version=None):
+        """Supprime les entrées correspondant aux filtres ; retourne leur nombre."""
+        return sum(self.store.delete(key) for key, _ in self.entries(question, model, prompt_version))
+
+    def clear(self):
+        return self.store.clear()
+
+    def stats(self):
+        return self.store.stats()
+
+_default_cache = None
+_default_lock = threading.Lock()
+_enabled = True
+
+def configure_llm_cache(path=DEFAULT_LLM_CACHE_PATH, ttl=None, max_entries=DEFAULT_LLM_CACHE_SIZE):
+    """
+    Configure le cache utilisé par sparql.generate_sparql_from_nlp ; path=None le désactive.
+
+    Returns:
+        LLMCache: Le nouveau cache (None s'il est désactivé).
+    """
+    global _default_cache, _enabled
+    with _default_lock:
+        _enabled = path is not None
+        _default_cache = LLMCache(path, ttl, max_entries) if _enabled else None
+        return _default_cache
+
+def get_llm_cache():
+    """Retourne le cache partagé (créé au premier appel), ou None s'il est désactivé."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None and _enabled:
+            _default_cache = LLMCache()
+        return _default_cache
+
+def main():
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description="Inspection et invalidation du cache des requêtes générées par le LLM")
+    parser.add_argument("--path", default=DEFAULT_LLM_CACHE_PATH, help="Fichier du cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("list", "Liste les entrées"), ("invalidate", "Supprime les entrées correspondant aux filtres")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("-q", "--question", help="Question (normalisée avant comparaison)")
+        sub.add_argument("--model", help="Modèle")
+        sub.add_argument("--prompt-version", help="Version du prompt")
+    show = subparsers.add_parser("show", help="Affiche la complétion brute et la requête d'une question")
+    show.add_argument("question")
+    subparsers.add_parser("clear", help="Vide le cache")
+    subparsers.add_parser("stats", help="Statistiques du cache")
+    args = parser.parse_args()
+
+    cache = LLMCache(args.path)
+    if args.command == "list":
+        for _, entry in cache.entries(args.question, args.model, args.prompt_version):
+            created = datetime.fromtimestamp(entry["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{created}  {entry['model']}  v{entry['prompt_version']}  {entry['question']}")
+    elif args.command == "show":
+        for _, entry in cache.entries(args.question):
+            print(f"=== {entry['question']} ({entry['model']}, prompt v{entry['prompt_version']}) ===")
+            print("\n--- Complétion brute ---\n")
+            print(entry["completion"])
+            print("\n--- Requête nettoyée ---\n")
+            print(entry["query"])
+    elif args.command == "invalidate":
+        if not (args.question or args.model or args.prompt_version):
+            parser.error("invalidate needs --question, --model or --prompt-version (use 'clear' to empty the cache)")
+        print(f"{cache.invalidate(args.question, args.model, args.prompt_version)} entrée(s) supprimée(s)")
+    elif args.command == "clear":
+        print(f"{cache.clear()} entrée(s) supprimée(s)")
+    else:
+        print(cache.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import json
+import os
+import pickle
+import threading
+from functools import lru_cache
+
+from endpoint_client import SparqlEndpointError
+from sparql_syntax import expand_prefixed_names, PARSER_LOCK
+
+LOCAL_ENDPOINT_SCHEME = "local:"
+DEFAULT_NEIGHBORHOOD_LIMIT = 1000
+
+@lru_cache(maxsize=4096)
+def _prepare(query):
+    from rdflib.plugins.sparql import prepareQuery
+
+    # rdflib ne connaît pas les préfixes prédéfinis de DBpedia
+    with PARSER_LOCK:
+        return prepareQuery(expand_prefixed_names(query))
+
+class LocalTripleStore:
+    """
+    Backend SPARQL en mémoire (rdflib) avec la même interface que endpoint_client.EndpointClient.
+
+    Charge des fichiers N-Triples/Turtle (un sous-ensemble de DBpedia, voir build_subset)
+    dans un graphe indexé et répond aux mêmes requêtes SELECT/ASK, au même format JSON,
+    sans aucun accès réseau. Les requêtes sont analysées une seule fois (cache LRU), ce qui
+    ramène une requête de template à une fraction de milliseconde.
+
+    Si store_path est donné, le graphe chargé y est sauvegardé (pickle) et rechargé
+    directement tant que les fichiers sources ne sont pas plus récents.
+    """
+
+    def __init__(self, paths=(), store_path=None):
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.store_path = store_path
+        self.endpoint = LOCAL_ENDPOINT_SCHEME + ",".join(self.paths)
+        self._lock = threading.Lock()
+        self.graph = self._load()
+
+    def _load(self):
+        import rdflib
+        from rdflib.util import guess_format
+
+        if self.store_path and os.path.exists(self.store_path):
+            stored_at = os.path.getmtime(self.store_path)
+            if all(os.path.getmtime(path) <= stored_at for path in self.paths):
+                with open(self.store_path, "rb") as f:
+                    return pickle.load(f)
+
+        graph = rdflib.Graph()
+        for path in self.paths:
+            graph.parse(path, format=guess_format(path) or "turtle")
+        if self.store_path:
+            with open(self.store_path, "wb") as f:
+                pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return graph
+
+    def query(self, query, params=None):
+        """
+        Exécute une requête SPARQL sur le graphe local.
+
+        Args:
+            query (str): La requête SPARQL.
+            params (dict, optional): Ignoré (paramètres propres à un endpoint HTTP).
+
+        Returns:
+            dict: Le JSON de résultats SPARQL (bindings ou booléen).
+
+        Raises:
+            SparqlEndpointError: Si la requête ne peut pas être analysée ou évaluée.
+        """
+        try:
+            prepared = _prepare(query)
+            # Le store mémoire de rdflib n'est pas prévu pour des lectures concurrentes
+            with self._lock:
+                result = self.graph.query(prepared)
+                data = result.serialize(format="json")
+        except Exception as e:
+            raise SparqlEndpointError(" ".join(str(e).split())) from e
+        return json.loads(data)
+
+    def __len__(self):
+        return len(self.graph)
+
+    def close(self):
+        pass
+
+def _binding_to_term(binding):
+    import rdflib
+
+    if binding["type"] == "uri":
+        return rdflib.URIRef(binding["value"])
+    if binding["type"] == "bnode":
+        return rdflib.BNode(binding["value"])
+    datatype = binding.get("datatype")
+    return rdflib.Literal(binding["value"], lang=binding.get("xml:lang"),
+                          datatype=rdflib.URIRef(datatype) if datatype else None)
+
+def build_subset(output_path, dbr_dict_path="dbr_dict.json", client=None, limit=DEFAULT_NEIGHBORHOOD_LIMIT, verbose=True):
+    """
+    Construit un fichier N-Triples avec le voisinage (triplets sortants et entrants)
+    des entités de dbr_dict.json, à charger ensuite dans un LocalTripleStore.
+
+    Args:
+        output_path (str): Fichier N-Triples à écrire.
+        dbr_dict_path (str): Dictionnaire des entités (valeurs "dbr:...").
+        client: Endpoint interrogé (le client partagé par défaut).
+        limit (int): Nombre maximal de triplets par entité et par direction.
+        verbose (bool): Afficher la progression.
+
+    Returns:
+        int: Le nombre de triplets écrits.
+    """
+    import rdflib
+    from endpoint_client import get_default_client
+    from generate_sparql import normalize_entity_name
+
+    client = client or get_default_client()
+    with open(dbr_dict_path, "r", encoding="utf-8") as f:
+        dbr_dict = json.load(f)
+    # Même normalisation que generate_sparql pour retrouver les IRIs des requêtes générées
+    entities = sorted({normalize_entity_name(value[4:]) for value in dbr_dict.values() if value.startswith("dbr:")})
+
+    graph = rdflib.Graph()
+    for i, name in enumerate(entities):
+        iri = f"<http://dbpedia.org/resource/{name}>"
+        queries = (
+            f"SELECT ?s ?p ?o WHERE {{ BIND({iri} AS ?s) ?s ?p ?o . }} LIMIT {limit}",
+            f"SELECT ?s ?p ?o WHERE {{ BIND({iri} AS ?o) ?s ?p ?o . }} LIMIT {limit}",
+        )
+        for query in queries:
+            try:
+                results = client.query(query)
+            except SparqlEndpointError as e:
+                if verbose:
+                    print(f"Skipping {name}: {e}")
+                continue
+            for row in results.get("results", {}).get("bindings", []):
+                graph.add((_binding_to_term(row["s"]), _binding_to_term(row["p"]), _binding_to_term(row["o"])))
+        if verbose and (i % 50 == 0 or i == len(entities) - 1):
+            print(f"Fetched {i+1}/{len(entities)} entities ({len(graph)} triples)")
+
+    graph.serialize(destination=output_path, format="nt", encoding="utf-8")
+    return len(graph)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a local DBpedia subset for offline SPARQL execution")
+    parser.add_argument("output", help="N-Triples file to write")
+    parser.add_argument("--dbr-dict", default="dbr_dict.json", help="Entity dictionary")
+    parser.add_argument("--limit", type=int, default=DEFAULT_NEIGHBORHOOD_LIMIT, help="Triples per entity and direction")
+    args = parser.parse_args()
+
+    count = build_subset(args.output, args.dbr_dict, limit=args.limit)
+    print(f"Wrote {count} triples to {args.output}")
+
+if __name__ == "__main__":
+    main()
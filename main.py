@@ -1,54 +1,395 @@
-from flair.models import TextClassifier
+import argparse
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from model_registry import get_tagger, get_classifier
+from joint_inference import share_embeddings, predict_joint
+from endpoint_client import configure_endpoint
+from answer_cache import AnswerCache, DEFAULT_ANSWER_CACHE_PATH, DEFAULT_ANSWER_TTL, DEFAULT_ANSWER_CACHE_SIZE
+from sparql_templates import load_templates
+from sparql_cache import configure_result_cache, DEFAULT_SPARQL_CACHE_PATH
+from semantic_cache import load_semantic_cache, DEFAULT_SEMANTIC_SOURCES, DEFAULT_SIMILARITY_THRESHOLD
 from classify_questions import *
 from entity_mapping import *
-from preprocessing_lemmatized_new import *
 from entity_type_tagging import *
-from verif_template import * 
+from verif_template import *
 from test_sparql_queries import *
 from sparql import *
 
-model = TextClassifier.load("template_classifier_model/best-model.pt")
+# Chemins des ressources chargées une seule fois par processus
+TAGGER_MODEL_PATH = "model/best-model.pt"
+CLASSIFIER_MODEL_PATH = "template_classifier_model/best-model.pt"
+DBR_DICT_PATH = "dbr_dict.json"
+TEMPLATE_MAP_PATH = "template_map.json"
 
-if __name__ == "__main__":
-    # Charger le dictionnaire DBpedia depuis "dbr_dict.json"
-    dbr_dict = load_json("dbr_dict.json")
-    
-    # Demander à l'utilisateur de saisir la requête
-    question = input("Veuillez saisir votre requête : ")
+# Mode spéculatif : sous ce score du classifieur, template et LLM partent en parallèle
+DEFAULT_SPECULATIVE_THRESHOLD = 0.8
+# Threads dédiés aux deux chemins spéculatifs (distincts du pool de answer_questions)
+SPECULATION_WORKERS = 16
+_speculation_pool = None
+_speculation_lock = threading.Lock()
+
+def get_speculation_pool():
+    """Retourne le pool des chemins spéculatifs, créé au premier usage du mode spéculatif."""
+    global _speculation_pool
+    with _speculation_lock:
+        if _speculation_pool is None:
+            _speculation_pool = ThreadPoolExecutor(max_workers=SPECULATION_WORKERS, thread_name_prefix="speculative")
+        return _speculation_pool
+
+def load_resources(embedding_cache_dir=None, answer_cache=None, speculative_threshold=None, semantic_cache=None):
+    """
+    Charge les modèles (via le registre partagé) et les dictionnaires utilisés par le pipeline.
+
+    Args:
+        embedding_cache_dir (str, optional): Dossier du cache disque des embeddings (désactivé si None).
+        answer_cache (AnswerCache, optional): Cache des réponses finales (désactivé si None).
+        speculative_threshold (float, optional): Active le mode spéculatif sous ce score
+            du classifieur (voir execute_speculative ; désactivé si None).
+        semantic_cache (SemanticQuestionCache, optional): Index des questions déjà résolues,
+            dont la requête est réutilisée pour les paraphrases (désactivé si None).
+
+    Returns:
+        dict: Le tagger, le classifieur, le dictionnaire DBpedia, la table des templates
+        et les caches éventuels.
+    """
+    from embedding_cache import EmbeddingCache
+
+    tagger = get_tagger(TAGGER_MODEL_PATH)
+    classifier = get_classifier(CLASSIFIER_MODEL_PATH)
+    # Une seule copie des embeddings glove/Flair LM pour les deux modèles
+    share_embeddings(tagger, classifier)
+    return {
+        "tagger": tagger,
+        "classifier": classifier,
+        "dbr_dict": load_json(DBR_DICT_PATH),
+        "templates": load_templates(TEMPLATE_MAP_PATH),
+        "embedding_cache": EmbeddingCache(embedding_cache_dir) if embedding_cache_dir else None,
+        "answer_cache": answer_cache,
+        "speculative_threshold": speculative_threshold,
+        "semantic_cache": semantic_cache,
+    }
+
+def analyse_questions(questions, resources, mini_batch_size=32):
+    """
+    Partie NLP du pipeline sur un lot de questions : tagging et classification
+    en mini-batchs Flair (embeddings calculés une seule fois pour les deux modèles),
+    puis mapping des entités et attribution du template.
+
+    Args:
+        questions (list): Les questions en langage naturel.
+        resources (dict): Les ressources retournées par load_resources().
+        mini_batch_size (int): Taille des mini-batchs Flair.
+
+    Returns:
+        list: Les payloads au format de mapped_classified_questions.json, dans l'ordre des questions.
+    """
+    # Tagging et classification sur les mêmes embeddings
+    predictions = predict_joint(questions, resources["tagger"], resources["classifier"], mini_batch_size,
+                                resources.get("embedding_cache"))
+
+    payloads = []
+    for question, (token_tags, template_id, confidence) in zip(questions, predictions):
+        payload = {
+            "question": question,
+            "entity_tagging": [],
+            "template_id": "",
+            "mapping": {},
+            "executed": True  # Valeur par défaut ; elle sera mise à jour après exécution
+        }
+        # Transformation de la sortie en une liste de dictionnaires
+        payload["entity_tagging"] = [{"token": token, "tag": tag} for token, tag in token_tags]
+
+        # Mapping des entités
+        payload["mapping"] = perform_entity_mapping(payload["question"], payload["entity_tagging"], resources["dbr_dict"])
+
+        # Attribution du template
+        payload["template_id"] = template_id
+        payload["template_confidence"] = confidence
+        payload["template_id"] = predire_template(payload)
+        payloads.append(payload)
+    return payloads
 
-    payload = {
+def analyse_question(question, resources):
+    """
+    Partie NLP du pipeline pour une seule question (voir analyse_questions).
+    """
+    return analyse_questions([question], resources)[0]
+
+def answer_with_llm(question, verbose=True, cancelled=None):
+    """
+    Passe par la génération SPARQL via ChatGPT et met le résultat au format dict
+    (cancelled : voir process_single_question).
+    """
+    query, results = process_single_question(question, verbose=verbose, cancelled=cancelled)
+    return {
         "question": question,
-        "entity_tagging": [],
-        "template_id": "",
-        "mapping": {},
-        "executed": True  # Valeur par défaut ; elle sera mise à jour après exécution
+        "query": query,
+        "results": results,
+        "executed": results is not None
     }
 
-    # Appel à la fonction de tagging qui retourne un dictionnaire
-    data = tag_entities_with_bilstm("model/best-model.pt", [question])
-    # Transformation de la sortie en une liste de dictionnaires
-    output_data = {}
-    for q, token_tuples in data.items():
-        output_data[q] = [{"token": token, "tag": tag} for token, tag in token_tuples]
-    if question in output_data:
-        payload["entity_tagging"] = output_data[question]
-    
-    # Mapping des entités
-    payload["mapping"] = perform_entity_mapping(payload["question"], payload["entity_tagging"], dbr_dict)
-    
-    # Attribution du template
-    payload["template_id"] = predict_template(payload["question"], model)
-    payload["template_id"] = predire_template(payload)
+def execute_payload(payload, resources):
+    """
+    Génère et exécute la requête SPARQL d'un payload, avec repli sur ChatGPT en cas d'échec.
+
+    Args:
+        payload (dict): Le payload retourné par analyse_question().
+        resources (dict): Les ressources retournées par load_resources().
 
+    Returns:
+        dict: Le résultat de l'exécution.
+    """
     # Exécution de la requête selon le template détecté
     if payload["template_id"] == 'unknown':
-        result = process_single_question(payload["question"])
-    else:
-        result = process_single_query(payload)
-    
+        return answer_with_llm(payload["question"])
+
+    threshold = resources.get("speculative_threshold")
+    if threshold is not None and payload.get("template_confidence", 1.0) < threshold:
+        return execute_speculative(payload, resources)
+
+    result = process_single_query(payload, resources["templates"])
+
     # Si la requête a échoué (ex: executed == False), on passe en mode "ChatGPT"
     if not result.get("executed", True):
         print("La requête a échoué. Passage en mode ChatGPT pour la génération de la question en langage naturel.")
-        result = process_single_question(payload["question"])
-    
-    print(result)
+        result = answer_with_llm(payload["question"])
+    return result
+
+def execute_speculative(payload, resources):
+    """
+    Mode spéculatif pour les questions dont le template est incertain : le chemin
+    template et le repli ChatGPT démarrent en même temps et la première réponse
+    exécutée avec des résultats l'emporte. L'autre chemin est alors annulé : il
+    s'arrête au prochain point de contrôle (avant l'appel au LLM, avant l'envoi de sa
+    requête SPARQL). Un appel déjà en cours se termine en arrière-plan et son résultat
+    est ignoré (une requête générée reste dans le cache LLM).
+
+    Args:
+        payload (dict): Le payload retourné par analyse_question().
+        resources (dict): Les ressources retournées par load_resources().
+
+    Returns:
+        dict: Le premier résultat exécuté, sinon celui du repli ChatGPT (comme execute_payload).
+    """
+    pool = get_speculation_pool()
+    cancelled = threading.Event()
+    template_future = pool.submit(process_single_query, payload, resources["templates"], cancelled)
+    llm_future = pool.submit(answer_with_llm, payload["question"], False, cancelled)
+    futures = {template_future, llm_future}
+
+    results = {}
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"question": payload["question"], "error": str(e), "executed": False}
+        if result.get("executed", False):
+            cancelled.set()
+            for other in futures - {future}:
+                other.cancel()
+            return result
+        results[future] = result
+    return results[llm_future]
+
+def lookup_answer(question, resources):
+    """Retourne la réponse en cache pour la question, ou None (cache absent ou miss)."""
+    cache = resources.get("answer_cache")
+    return cache.get(question) if cache is not None else None
+
+def answer_from_semantic_cache(question, resources):
+    """
+    Réutilise la requête d'une question déjà résolue équivalente (voir semantic_cache),
+    sans tagging, classification ni LLM.
+
+    Returns:
+        dict: Le résultat si la requête réutilisée renvoie des résultats, sinon None
+        (index absent, aucune question proche, ou requête sans résultat pour celle-ci).
+    """
+    semantic = resources.get("semantic_cache")
+    match = semantic.lookup(question) if semantic is not None else None
+    if match is None:
+        return None
+    outcome = run_sparql_query(match["query"])
+    if not (outcome["valid"] and outcome["success"]):
+        return None
+    return {
+        "question": question,
+        "query": match["query"],
+        "matched_question": match["question"],
+        "similarity": match["similarity"],
+        "valid": True,
+        "validation_message": outcome["validation_message"],
+        "executed": True,
+        "results": outcome["formatted_results"],
+    }
+
+def store_answer(question, result, resources):
+    """Enregistre la réponse dans les caches activés (réponses et index sémantique)."""
+    cache = resources.get("answer_cache")
+    if cache is not None:
+        cache.put(question, result)
+    semantic = resources.get("semantic_cache")
+    if semantic is not None and result.get("valid") and result.get("executed") and result.get("query"):
+        semantic.add(question, result["query"], result.get("entity_mappings"))
+
+def answer_question(question, resources):
+    """
+    Exécute le pipeline complet sur une question avec des ressources déjà chargées.
+    Une question déjà résolue est servie directement depuis le cache des réponses,
+    une paraphrase d'une question résolue réutilise sa requête (index sémantique).
+    """
+    cached = lookup_answer(question, resources)
+    if cached is not None:
+        return cached
+    result = answer_from_semantic_cache(question, resources)
+    if result is None:
+        result = execute_payload(analyse_question(question, resources), resources)
+    store_answer(question, result, resources)
+    return result
+
+def answer_questions(questions, resources=None, batch_size=64, workers=8, mini_batch_size=32):
+    """
+    Exécute le pipeline sur une liste de questions, étape par étape sur chaque lot.
+
+    Les questions sont découpées en lots de batch_size : le tagging et la classification
+    tournent en mini-batchs Flair sur tout le lot, puis la génération et l'exécution SPARQL
+    sont réparties sur un pool de threads. Les résultats sont produits au fur et à mesure,
+    dans l'ordre des questions. Les questions présentes dans le cache des réponses
+    ne passent par aucune étape, celles résolues par l'index sémantique ne passent
+    pas par les modèles.
+
+    Args:
+        questions (list): Les questions en langage naturel.
+        resources (dict, optional): Les ressources de load_resources() ; chargées si None.
+        batch_size (int): Nombre de questions traitées par lot.
+        workers (int): Nombre de threads pour la génération et l'exécution des requêtes.
+        mini_batch_size (int): Taille des mini-batchs Flair.
+
+    Yields:
+        dict: Le résultat de chaque question, dans l'ordre d'entrée.
+    """
+    if resources is None:
+        resources = load_resources()
+
+    def execute_and_store(payload):
+        result = execute_payload(payload, resources)
+        store_answer(payload["question"], result, resources)
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(questions), batch_size):
+            batch = questions[start:start + batch_size]
+            cached = [lookup_answer(question, resources) for question in batch]
+            missing = [question for question, result in zip(batch, cached) if result is None]
+            if resources.get("semantic_cache") is not None:
+                reused = iter(list(executor.map(lambda question: answer_from_semantic_cache(question, resources), missing)))
+                cached = [result if result is not None else next(reused) for result in cached]
+                for question, result in zip(batch, cached):
+                    if result is not None and "matched_question" in result:
+                        store_answer(question, result, resources)
+                missing = [question for question, result in zip(batch, cached) if result is None]
+
+            payloads = analyse_questions(missing, resources, mini_batch_size) if missing else []
+            computed = executor.map(execute_and_store, payloads)
+            for result in cached:
+                yield result if result is not None else next(computed)
+
+def read_questions(file_path):
+    """Lit un fichier de questions (une par ligne) en ignorant les lignes vides."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+ENDPOINT_HELP = "Endpoint SPARQL : URL(s) http(s) séparées par des virgules ou \"local:fichier.nt[,store.pickle]\" (DBpedia par défaut)"
+
+def add_answer_cache_arguments(parser):
+    """Options du cache des réponses, partagées par main.py et qa_server.py."""
+    parser.add_argument("--answer-cache", type=str, nargs="?", const=DEFAULT_ANSWER_CACHE_PATH,
+                        help=f"Active le cache SQLite des réponses (fichier {DEFAULT_ANSWER_CACHE_PATH} par défaut)")
+    parser.add_argument("--answer-cache-ttl", type=float, default=DEFAULT_ANSWER_TTL, help="Durée de vie d'une réponse (secondes)")
+    parser.add_argument("--answer-cache-size", type=int, default=DEFAULT_ANSWER_CACHE_SIZE, help="Nombre maximal de réponses en cache")
+
+def add_result_cache_argument(parser):
+    """Option du cache des résultats SPARQL, partagée par main.py et qa_server.py."""
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Désactive le cache des résultats SPARQL (actif par défaut : fichier "
+                             f"{DEFAULT_SPARQL_CACHE_PATH} du dossier courant)")
+
+def add_speculative_argument(parser):
+    """Option du mode spéculatif, partagée par main.py et qa_server.py."""
+    parser.add_argument("--speculative", type=float, nargs="?", const=DEFAULT_SPECULATIVE_THRESHOLD,
+                        help="Lance template et ChatGPT en parallèle quand le score du classifieur est sous "
+                             f"ce seuil ({DEFAULT_SPECULATIVE_THRESHOLD} par défaut)")
+
+def add_semantic_cache_arguments(parser):
+    """Options de l'index sémantique des questions, partagées par main.py et qa_server.py."""
+    parser.add_argument("--semantic-cache", type=str, nargs="*",
+                        help="Réutilise la requête des questions déjà résolues pour leurs paraphrases "
+                             f"(fichiers de résultats, {', '.join(DEFAULT_SEMANTIC_SOURCES)} par défaut)")
+    parser.add_argument("--semantic-threshold", type=float, default=DEFAULT_SIMILARITY_THRESHOLD,
+                        help="Similarité minimale (cosinus, hors entités) pour réutiliser une requête")
+
+def semantic_cache_from_args(args):
+    """Construit le SemanticQuestionCache demandé sur la ligne de commande (None si désactivé)."""
+    if args.semantic_cache is None:
+        return None
+    return load_semantic_cache(args.semantic_cache or DEFAULT_SEMANTIC_SOURCES, args.semantic_threshold)
+
+def answer_cache_from_args(args):
+    """Construit l'AnswerCache demandé sur la ligne de commande (None si désactivé)."""
+    if not args.answer_cache:
+        return None
+    return AnswerCache(args.answer_cache, ttl=args.answer_cache_ttl, max_entries=args.answer_cache_size)
+
+def main():
+    parser = argparse.ArgumentParser(description="Question answering sur DBpedia")
+    input_group = parser.add_mutually_exclusive_group()
+    input_group.add_argument("-q", "--question", type=str, help="Question unique à traiter")
+    input_group.add_argument("-f", "--file", type=str, help="Fichier de questions (une par ligne), traité par lots")
+    parser.add_argument("-o", "--output", type=str, help="Fichier JSONL de sortie en mode --file (stdout par défaut)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Nombre de questions par lot")
+    parser.add_argument("--workers", type=int, default=8, help="Threads pour l'exécution des requêtes")
+    parser.add_argument("--mini-batch-size", type=int, default=32, help="Taille des mini-batchs Flair")
+    parser.add_argument("--embedding-cache", type=str, help="Dossier du cache disque des embeddings de tokens")
+    parser.add_argument("--endpoint", type=str, help=ENDPOINT_HELP)
+    add_speculative_argument(parser)
+    add_answer_cache_arguments(parser)
+    add_semantic_cache_arguments(parser)
+    add_result_cache_argument(parser)
+    args = parser.parse_args()
+    if args.no_cache:
+        configure_result_cache(None)
+    if args.endpoint:
+        configure_endpoint(args.endpoint)
+
+    resources = load_resources(args.embedding_cache, answer_cache_from_args(args), args.speculative,
+                               semantic_cache_from_args(args))
+
+    if args.file:
+        questions = read_questions(args.file)
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        try:
+            for result in answer_questions(questions, resources, args.batch_size, args.workers, args.mini_batch_size):
+                out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    else:
+        # Demander à l'utilisateur de saisir la requête
+        question = args.question or input("Veuillez saisir votre requête : ")
+
+        result = answer_question(question, resources)
+        print(result)
+
+    if resources["embedding_cache"] is not None:
+        print(f"Cache d'embeddings : {resources['embedding_cache'].stats()}", file=sys.stderr)
+    if resources["answer_cache"] is not None:
+        print(f"Cache des réponses : {resources['answer_cache'].stats()}", file=sys.stderr)
+    if resources["semantic_cache"] is not None:
+        print(f"Index sémantique : {resources['semantic_cache'].stats()}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Nombre maximal de modèles gardés en mémoire simultanément
+DEFAULT_CAPACITY = 4
+
+class ModelRegistry:
+    """
+    Cache de modèles partagé par tout le processus.
+
+    Chaque modèle est indexé par (classe, chemin absolu, mtime du fichier) : un fichier
+    réentraîné est donc rechargé automatiquement, tandis qu'un modèle inchangé n'est
+    jamais relu depuis le disque. Au-delà de `capacity` modèles, le moins récemment
+    utilisé est libéré (LRU).
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(loader, model_path):
+        path = os.path.abspath(model_path)
+        return (loader.__name__, path, os.path.getmtime(path))
+
+    def get(self, loader, model_path):
+        """
+        Retourne le modèle demandé, en le chargeant via loader.load(model_path) si besoin.
+
+        Args:
+            loader: Classe exposant une méthode load(path) (SequenceTagger, TextClassifier...).
+            model_path (str): Chemin vers le fichier .pt.
+
+        Returns:
+            Le modèle chargé.
+        """
+        key = self._key(loader, model_path)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+
+            # Une ancienne version du même fichier n'est plus atteignable : on la libère
+            for stale in [k for k in self._models if k[:2] == key[:2]]:
+                del self._models[stale]
+
+            model = loader.load(key[1])
+            self._models[key] = model
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+            return model
+
+    def preload(self, loader, model_path):
+        """Charge un modèle à l'avance (ex: au démarrage d'un serveur)."""
+        return self.get(loader, model_path)
+
+    def evict(self, model_path=None):
+        """
+        Libère un modèle (toutes ses versions) ou, sans argument, tous les modèles.
+
+        Returns:
+            int: Le nombre de modèles libérés.
+        """
+        with self._lock:
+            if model_path is None:
+                count = len(self._models)
+                self._models.clear()
+                return count
+            path = os.path.abspath(model_path)
+            keys = [k for k in self._models if k[1] == path]
+            for key in keys:
+                del self._models[key]
+            return len(keys)
+
+    def resize(self, capacity):
+        """Change la capacité et libère les modèles en trop."""
+        with self._lock:
+            self.capacity = capacity
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+
+    def loaded(self):
+        """Liste des (classe, chemin, mtime) actuellement en mémoire, du plus ancien au plus récent."""
+        with self._lock:
+            return list(self._models)
+
+# Registre partagé par tout le processus
+registry = ModelRegistry()
+
+def get_model(loader, model_path):
+    return registry.get(loader, model_path)
+
+def preload(loader, model_path):
+    return registry.preload(loader, model_path)
+
+def evict(model_path=None):
+    return registry.evict(model_path)
+
+def get_tagger(model_path):
+    """Retourne le SequenceTagger Flair de model_path via le registre."""
+    from flair.models import SequenceTagger
+    return registry.get(SequenceTagger, model_path)
+
+def get_classifier(model_path):
+    """Retourne le TextClassifier Flair de model_path via le registre."""
+    from flair.models import TextClassifier
+    return registry.get(TextClassifier, model_path)
@@ -0,0 +1,243 @@
+import re
+
+# Prédicats courants mais rarement porteurs de sens : priorité minimale
+LOW_PRIORITY_PREDICATES = ('is', 'was', 'are', 'were', 'does', 'did', 'has', 'have', 'had', 'in', 'on', 'at', 'by', 'to', 'for')
+LOW_PRIORITY = 1
+DEFAULT_PRIORITY = 2
+ACTION_PRIORITY = 10
+# Mots distincts (vocabulaire des questions et des clés) dont l'analyse est gardée
+TOKEN_CACHE_SIZE = 1 << 16
+
+# Règles de classement des prédicats candidats, par template.
+#
+# "rules" est une chaîne de elif : seule la première règle dont la question contient
+# au moins un mot de chaque groupe de "question" s'applique. Un candidat dont la clé
+# (le texte de la question associé au prédicat) contient un mot de "key" prend "weight",
+# et "exact_weight" si la clé est exactement l'un des "exact_keys".
+# "actions" est vérifié ensuite pour chaque candidat : un mot présent à la fois dans la
+# question et dans la clé donne ACTION_PRIORITY, même après une règle à 15.
+PREDICATE_RULES = {
+    "A": {
+        "rules": [
+            {"question": [["born", "birth"], ["year"]], "key": ["birth", "born", "year"], "weight": 10,
+             "exact_keys": ["birthyear", "birth year"], "exact_weight": 15},
+            {"question": [["die", "death"], ["year"]], "key": ["death", "die", "year"], "weight": 10,
+             "exact_keys": ["deathyear", "death year"], "exact_weight": 15},
+            {"question": [["where", "location", "place"]], "key": ["location", "place", "country", "city"], "weight": 10},
+            {"question": [["who wrote", "author", "writer"]], "key": ["author", "writer", "wrote"], "weight": 10},
+            {"question": [["when", "date", "year"], ["create", "found", "establish"]],
+             "key": ["date", "year", "found", "establish", "create"], "weight": 10},
+            {"question": [["currency"]], "key": ["currency"], "weight": 15},
+        ],
+        "actions": ["start", "end", "direct", "write", "compose", "invent", "discover", "marry", "spouse", "starring", "actor", "actress"],
+    },
+    "B": {
+        "rules": [
+            {"question": [["actor", "actress", "star", "cast"]], "key": ["actor", "actress", "star", "cast"], "weight": 10},
+            {"question": [["author", "writer", "wrote"]], "key": ["author", "writer", "wrote"], "weight": 10},
+            {"question": [["director"]], "key": ["direct"], "weight": 10},
+        ],
+        "actions": ["spouse", "marry", "child", "parent", "discover", "invent", "found", "create", "currency"],
+    },
+    "D": {
+        "rules": [
+            {"question": [["spouse", "married", "husband", "wife"]], "key": ["spouse", "married", "husband", "wife"], "weight": 10},
+            {"question": [["parent", "child", "son", "daughter", "father", "mother"]],
+             "key": ["parent", "child", "son", "daughter", "father", "mother"], "weight": 10},
+            {"question": [["currency"]], "key": ["currency"], "weight": 15},
+        ],
+        "actions": ["direct", "create", "write", "compose", "discover", "invent", "found"],
+    },
+}
+
+def _trie_pattern(keywords):
+    """Alternative factorisée par préfixes communs ("b(?:irth|orn)"), plus rapide pour re qu'une liste à plat."""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Quantificateur glouton : le mot le plus long l'emporte à une position donnée
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+class KeywordMatcher:
+    """
+    Recherche simultanée de mots-clés (sous-chaînes) avec une seule expression régulière.
+
+    L'expression, un trie de tous les mots, capture à chaque position le mot le plus long ;
+    les mots qu'il contient ("star" dans "starring", "year" dans "birthyear") lui sont
+    ajoutés. Seuls manquent alors les mots qui commencent dans un mot capturé et finissent
+    après lui ("date" dans "childate") : ils sont vérifiés à part quand le mot capturé le
+    permet. Le résultat est exactement l'ensemble des mots x tels que `x in text`.
+
+    Chaque mot a un bit : un ensemble de mots est un entier (voir mask).
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted(set(keywords))
+        self.bits = {keyword: 1 << i for i, keyword in enumerate(self.keywords)}
+        self.pattern = re.compile(_trie_pattern(self.keywords))
+        self.phrases = tuple(keyword for keyword in self.keywords if len(keyword.split()) != 1)
+        self.contained = {keyword: self.mask_of(other for other in self.keywords if other in keyword)
+                          for keyword in self.keywords}
+        # Mots dont un préfixe est un suffixe propre d'un autre mot
+        self.straddling = {
+            keyword: tuple(other for other in self.keywords if other not in keyword and any(
+                keyword.endswith(other[:size]) for size in range(1, min(len(keyword), len(other)))))
+            for keyword in self.keywords
+        }
+        self._tokens = {}
+
+    def mask_of(self, keywords):
+        """Entier dont les bits sont ceux des mots donnés."""
+        mask = 0
+        for keyword in keywords:
+            mask |= self.bits[keyword]
+        return mask
+
+    def _scan(self, text):
+        found = 0
+        for keyword in self.pattern.findall(text):
+            found |= self.contained[keyword]
+            for other in self.straddling[keyword]:
+                if not found & self.bits[other] and other in text:
+                    found |= self.contained[other]
+        return found
+
+    def mask(self, text):
+        """
+        Bits des mots-clés contenus dans text.
+
+        Un mot-clé sans espace tient dans un seul mot du texte : chaque mot n'est analysé
+        qu'une fois (cache), et seuls les mots-clés avec espace ("who wrote") sont
+        cherchés dans le texte entier.
+        """
+        found = 0
+        cache = self._tokens
+        for token in text.split():
+            bits = cache.get(token)
+            if bits is None:
+                if len(cache) >= TOKEN_CACHE_SIZE:
+                    cache.clear()
+                bits = cache[token] = self._scan(token)
+            found |= bits
+        for phrase in self.phrases:
+            if phrase in text:
+                found |= self.bits[phrase]
+        return found
+
+    def find(self, text):
+        """Ensemble des mots-clés contenus dans text."""
+        found = self.mask(text)
+        return {keyword for keyword, bit in self.bits.items() if found & bit}
+
+class PredicateRanker:
+    """
+    Table de règles compilée une seule fois pour tous les templates.
+
+    Un seul matcher couvre tous les mots des règles : il parcourt la question une fois
+    pour trouver la règle déclenchée et les actions présentes, et chaque clé une fois
+    (résultat mis en cache). Le score d'un candidat se réduit ensuite à des ET binaires.
+    """
+
+    def __init__(self, rules=PREDICATE_RULES, low_priority_predicates=LOW_PRIORITY_PREDICATES):
+        self.low_priority_predicates = frozenset(low_priority_predicates)
+        words = set()
+        for table in rules.values():
+            for rule in table["rules"]:
+                words.update(word for group in rule["question"] for word in group)
+                words.update(rule["key"])
+            words.update(table["actions"])
+        self.matcher = KeywordMatcher(words)
+        # Par template : règles (masques des groupes de la question, masque de la clé, poids,
+        # clés exactes, poids exact) dans l'ordre de la chaîne elif, puis masque des actions
+        self.compiled = {
+            template_id: (
+                [(tuple(self.matcher.mask_of(group) for group in rule["question"]), self.matcher.mask_of(rule["key"]),
+                  rule["weight"], frozenset(rule.get("exact_keys", ())), rule.get("exact_weight"))
+                 for rule in table["rules"]],
+                self.matcher.mask_of(table["actions"]),
+            )
+            for template_id, table in rules.items()
+        }
+        self._keys = {}
+
+    def question_rule(self, template_id, question):
+        """
+        Règle et actions déclenchées par une question.
+
+        Returns:
+            tuple: (règle compilée de la chaîne elif ou None, masque des actions présentes)
+        """
+        # Template sans règles (ajouté à template_map.json seulement) : priorités par défaut
+        compiled_rules, actions = self.compiled.get(template_id, ((), 0))
+        found = self.matcher.mask(question.lower())
+        for rule in compiled_rules:
+            for group in rule[0]:
+                if not found & group:
+                    break
+            else:
+                return rule, actions & found
+        return None, actions & found
+
+    def score(self, template_id, question, mappings):
+        """
+        Priorité de chaque prédicat dbo: de mappings pour la question.
+
+        Returns:
+            dict: {prédicat: priorité}, dans l'ordre des mappings (un prédicat associé
+            à plusieurs clés garde la priorité de la dernière).
+        """
+        rule, actions = self.question_rule(template_id, question)
+        candidates = {}
+        for key, value in mappings.items():
+            if not value.startswith('dbo:'):
+                continue
+            if value[4:].lower() in self.low_priority_predicates:
+                candidates[value] = LOW_PRIORITY
+                continue
+
+            priority = DEFAULT_PRIORITY
+            words = self._keys.get(key)
+            if words is None:
+                if len(self._keys) >= TOKEN_CACHE_SIZE:
+                    self._keys.clear()
+                words = self._keys[key] = self.matcher.mask(key.lower())
+            if rule is not None and words & rule[1]:
+                priority = rule[2]
+                if rule[3] and key.lower() in rule[3]:
+                    priority = rule[4]
+            if words & actions:
+                priority = ACTION_PRIORITY
+            candidates[value] = priority
+        return candidates
+
+    def best_predicate(self, template_id, question, mappings):
+        """Le prédicat de plus haute priorité (le premier en cas d'égalité), ou None."""
+        candidates = self.score(template_id, question, mappings)
+        if not candidates:
+            return None
+        return max(candidates.items(), key=lambda x: x[1])[0]
+
+    def ranked_predicates(self, template_id, question, mappings):
+        """Les prédicats par priorité décroissante (ordre des mappings en cas d'égalité)."""
+        candidates = self.score(template_id, question, mappings)
+        return sorted(candidates, key=lambda value: -candidates[value])
+
+_default_ranker = None
+
+def get_predicate_ranker():
+    """Retourne le classeur partagé, compilé au premier appel."""
+    global _default_ranker
+    if _default_ranker is None:
+        _default_ranker = PredicateRanker()
+    return _default_ranker
@@ -1,7 +1,14 @@
-import spacy
+from functools import lru_cache
 
-# Charger le modèle NLP de spaCy
-nlp = spacy.load("en_core_web_trf")
+SPACY_MODEL = "en_core_web_trf"
+
+@lru_cache(maxsize=None)
+def get_nlp(model_name=SPACY_MODEL):
+    """
+    Charge le modèle NLP de spaCy au premier appel seulement (l'import de ce module reste léger).
+    """
+    import spacy
+    return spacy.load(model_name)
 
 def correct_pos(token, context):
     """
@@ -24,7 +31,7 @@ def preprocess_question(question):
     - Détection des entités nommées
     - Correction automatique des POS-tags et des entités mal classées
     """
-    doc = nlp(question)
+    doc = get_nlp()(question)
 
     # 📌 Fusion des entités multi-mots détectées par spaCy
     entity_dict = {ent.text: ent.label_ for ent in doc.ents}
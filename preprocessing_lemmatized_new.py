@@ -1,7 +1,5 @@
-import spacy
-
-# Charger le modèle NLP de spaCy
-nlp = spacy.load("en_core_web_trf")
+# Le modèle spaCy est chargé à la première utilisation (partagé avec preprocessing_lemmatized)
+from preprocessing_lemmatized import get_nlp
 
 def correct_pos(token, context):
     """
@@ -23,7 +21,7 @@ def preprocess_question(question):
     - Correction automatique des POS-tags
     La fusion des entités multi-mots et la liste des entités ne sont plus appliquées.
     """
-    doc = nlp(question)
+    doc = get_nlp()(question)
 
     tokens = []
     lemmas = []
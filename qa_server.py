@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import main as pipeline
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+MAX_BODY_SIZE = 64 * 1024
+
+class QAServer:
+    """
+    Serveur HTTP/JSON asyncio qui garde les modèles chargés en mémoire.
+
+    Les ressources (tagger, classifieur, dbr_dict, template_map) sont chargées une
+    seule fois au démarrage ; chaque requête POST /answer exécute ensuite le même
+    pipeline que main.py.
+    """
+
+    def __init__(self, resources, workers=4):
+        self.resources = resources
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # Les modèles Flair ne sont pas prévus pour l'inférence concurrente :
+        # seule la partie NLP est sérialisée, l'exécution SPARQL reste parallèle.
+        self.model_lock = threading.Lock()
+
+    def answer(self, question):
+        """Exécute le pipeline complet (appelé dans un thread de l'executor)."""
+        cached = pipeline.lookup_answer(question, self.resources)
+        if cached is not None:
+            return cached
+        result = pipeline.answer_from_semantic_cache(question, self.resources)
+        if result is None:
+            with self.model_lock:
+                payload = pipeline.analyse_question(question, self.resources)
+            result = pipeline.execute_payload(payload, self.resources)
+        pipeline.store_answer(question, result, self.resources)
+        return result
+
+    async def route(self, method, path, body):
+        """Retourne (status, objet JSON) pour une requête."""
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path != "/answer":
+            return 404, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST with a JSON body {\"question\": \"...\"}"}
+
+        try:
+            data = json.loads(body.decode("utf-8") or "{}")
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return 400, {"error": "Invalid JSON body"}
+        question = data.get("question") if isinstance(data, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            return 400, {"error": "Missing 'question' field"}
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, self.answer, question.strip())
+        except Exception as e:
+            return 500, {"question": question, "error": str(e)}
+        return 200, result
+
+    async def handle_connection(self, reader, writer):
+        """Lit les requêtes HTTP/1.1 d'une connexion (keep-alive supporté)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.send(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.send(writer, 400, {"error": "Invalid Content-Length"}, keep_alive=False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self.send(writer, 413, {"error": "Request body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+
+                status, response = await self.route(method.upper(), path.split("?", 1)[0], body)
+                await self.send(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, status, obj, keep_alive):
+        """Sérialise une réponse JSON."""
+        body = json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serveur QA prêt sur http://{host}:{port} (POST /answer)")
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur QA persistant (modèles chargés une seule fois)")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute (localhost par défaut)")
+    parser.add_argument("--port", type=int, default=8000, help="Port d'écoute")
+    parser.add_argument("--workers", type=int, default=4, help="Nombre de threads pour le pipeline")
+    parser.add_argument("--embedding-cache", type=str, help="Dossier du cache disque des embeddings de tokens")
+    parser.add_argument("--endpoint", type=str, help=pipeline.ENDPOINT_HELP)
+    pipeline.add_speculative_argument(parser)
+    pipeline.add_semantic_cache_arguments(parser)
+    pipeline.add_answer_cache_arguments(parser)
+    pipeline.add_result_cache_argument(parser)
+    args = parser.parse_args()
+    if args.no_cache:
+        pipeline.configure_result_cache(None)
+    if args.endpoint:
+        pipeline.configure_endpoint(args.endpoint)
+
+    print("Chargement des modèles...")
+    resources = pipeline.load_resources(args.embedding_cache, pipeline.answer_cache_from_args(args), args.speculative,
+                                        pipeline.semantic_cache_from_args(args))
+    server = QAServer(resources, workers=args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Arrêt du serveur.")
+
+if __name__ == "__main__":
+    main()
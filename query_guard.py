@@ -0,0 +1,141 @@
+from sparql_syntax import tokenize_sparql, query_form, has_limit_or_offset
+
+# LIMIT ajouté aux SELECT générés qui n'en ont pas (0 : pas d'injection)
+DEFAULT_QUERY_LIMIT = 1000
+
+_query_limit = DEFAULT_QUERY_LIMIT
+
+_TERMS = ("var", "iri", "pname", "string", "number")
+_SKIPPED_CALLS = ("FILTER", "BIND")
+_GROUP_KEYWORDS = ("OPTIONAL", "MINUS", "UNION", "GRAPH", "SERVICE", "SILENT", "EXISTS", "NOT")
+
+def configure_guard(limit=DEFAULT_QUERY_LIMIT):
+    """Change le LIMIT injecté par défaut par guard_query (0 pour le désactiver)."""
+    global _query_limit
+    _query_limit = limit
+
+def _skip_parentheses(tokens, i):
+    """Index du token qui suit le groupe parenthésé commençant à tokens[i]."""
+    depth = 0
+    while i < len(tokens):
+        if tokens[i] == ("punct", "("):
+            depth += 1
+        elif tokens[i] == ("punct", ")"):
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+def _triple_patterns(tokens):
+    """
+    Extrait grossièrement les triplets du corps de la requête (raccourcis ";" et ","
+    compris) et les variables liées par VALUES ou BIND. Les triplets contenant un chemin,
+    une collection ou un nœud anonyme sont ignorés.
+
+    Returns:
+        tuple: (liste de triplets [(kind, text)] * 3, ensemble de variables liées)
+    """
+    triples = []
+    bound = set()
+    current = [None, None, None]
+    position = 0
+    simple = True
+    # Le corps commence à la première accolade (après la projection)
+    i = next((k for k, token in enumerate(tokens) if token == ("punct", "{")), len(tokens))
+    while i < len(tokens):
+        kind, text = tokens[i]
+        word = text.upper() if kind == "word" else None
+        if word in _SKIPPED_CALLS:
+            end = _skip_parentheses(tokens, i + 1)
+            if word == "BIND" and end - 2 > i and tokens[end - 2][0] == "var":
+                bound.add(tokens[end - 2][1][1:])
+            i, position, simple = end, 0, True
+            continue
+        if word == "VALUES":
+            # Variables de VALUES, puis bloc de données jusqu'à l'accolade fermante
+            i += 1
+            while i < len(tokens) and tokens[i] != ("punct", "{"):
+                if tokens[i][0] == "var":
+                    bound.add(tokens[i][1][1:])
+                i += 1
+            while i < len(tokens) and tokens[i] != ("punct", "}"):
+                i += 1
+            i, position, simple = i + 1, 0, True
+            continue
+        if word == "SELECT":
+            # Projection d'une sous-requête : pas des termes de triplet
+            while i < len(tokens) and tokens[i] != ("punct", "{"):
+                i += 1
+            position, simple = 0, True
+            continue
+        if kind == "punct" and text in ("{", "}", "."):
+            position, simple = 0, True
+        elif word in _GROUP_KEYWORDS or word == "WHERE":
+            position, simple = 0, True
+        elif kind == "punct" and text == ";":
+            position = 1
+        elif kind == "punct" and text == ",":
+            position = 2
+        elif kind in _TERMS or (kind == "word" and text == "a"):
+            if position < 3:
+                current[position] = (kind, text)
+                position += 1
+                if position == 3:
+                    if simple:
+                        triples.append(tuple(current))
+                    simple = True
+        else:
+            # Chemin de propriétés, collection, nœud anonyme... : triplet non analysé
+            simple = False
+        i += 1
+    return triples, bound
+
+def find_unbound_pattern(query):
+    """
+    Cherche un triplet entièrement variable (?s ?p ?o) qu'aucune constante ne rattache,
+    directement ou via d'autres triplets, VALUES ou BIND : il parcourt tout le graphe.
+
+    Returns:
+        str: Le triplet en cause, ou None.
+    """
+    triples, bound = _triple_patterns(tokenize_sparql(query))
+    # Propagation : un triplet avec une constante ou une variable liée lie toutes ses variables
+    changed = True
+    while changed:
+        changed = False
+        for triple in triples:
+            variables = {text[1:] for kind, text in triple if kind == "var"}
+            if len(variables) < 3 or variables & bound:
+                if not variables <= bound:
+                    bound |= variables
+                    changed = True
+    for triple in triples:
+        variables = {text[1:] for kind, text in triple if kind == "var"}
+        if len(variables) == 3 and not variables & bound:
+            return " ".join(text for _, text in triple)
+    return None
+
+def guard_query(query, limit=None):
+    """
+    Garde-fou appliqué aux requêtes générées avant leur exécution.
+
+    - rejette les requêtes qui parcourent tout le graphe (find_unbound_pattern) ;
+    - ajoute un LIMIT aux SELECT qui n'ont ni LIMIT ni OFFSET.
+    Le délai d'exécution côté serveur est envoyé par le client (endpoint_client.DEFAULT_SERVER_TIMEOUT).
+
+    Args:
+        query (str): La requête nettoyée (voir sparql_utils.clean_sparql_query).
+        limit (int, optional): LIMIT à injecter (valeur de configure_guard si None, 0 pour aucun).
+
+    Returns:
+        tuple: (requête à exécuter, motif du rejet ou None)
+    """
+    unbound = find_unbound_pattern(query)
+    if unbound:
+        return query, f"Rejected: unbound triple pattern over the whole graph ({unbound})"
+
+    limit = _query_limit if limit is None else limit
+    if limit and query_form(query) == "SELECT" and not has_limit_or_offset(query):
+        query = f"{query.rstrip()}\nLIMIT {limit}"
+    return query, None
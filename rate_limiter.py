@@ -0,0 +1,46 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Limiteur de débit à seau de jetons, partagé entre threads.
+
+    Le seau se remplit de `rate` jetons par seconde jusqu'à `capacity` (rafale autorisée) ;
+    chaque appel à acquire consomme un jeton et attend s'il n'y en a plus.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Consomme des jetons s'ils sont disponibles, sans attendre ; retourne True si c'est le cas."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """Attend que des jetons soient disponibles puis les consomme ; retourne le temps d'attente."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
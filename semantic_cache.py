@@ -0,0 +1,278 @@
+import json
+import re
+import threading
+import zlib
+from urllib.parse import unquote
+
+import numpy as np
+
+from answer_cache import normalize_question
+
+# Fichiers question → requête déjà vérifiés, chargés par défaut
+DEFAULT_SEMANTIC_SOURCES = ("test_results.json", "improved_results.json")
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+DEFAULT_VECTOR_DIM = 1024
+# Au-delà de cette taille, la recherche passe par l'index approximatif (LSH)
+DEFAULT_LSH_MIN_SIZE = 10000
+LSH_TABLES = 8
+LSH_BITS = 12
+# Nombre de voisins examinés pour trouver une entrée dont les entités correspondent
+DEFAULT_CANDIDATES = 20
+
+_WORD_RE = re.compile(r"[\w'.-]+")
+# Mots outils ignorés dans la comparaison des relations ; les mots interrogatifs qui
+# changent la réponse (who, when, where, how...) n'en font pas partie
+STOP_WORDS = frozenset(
+    "a an the of in on at to for by from with and or as is are was were be been being "
+    "do does did has have had what which give me tell show list name please".split())
+# Une négation n'est jamais ignorée : "who is not the wife of X" ne réutilise pas "who is the wife of X"
+NEGATION_WORDS = frozenset(("not", "no", "never", "without", "nor", "none", "neither", "nobody", "nothing"))
+_ENTITY_RE = re.compile(r"(?:dbr:|<http://dbpedia\.org/resource/)([^\s>.;,]+(?:\.[^\s>.;,]+)*)")
+
+def embed_question(question, dim=DEFAULT_VECTOR_DIM):
+    """
+    Vecteur normalisé (L2) d'une question : mots et trigrammes de caractères hachés
+    dans `dim` dimensions. Aucun modèle n'est nécessaire, les paraphrases proches
+    partagent l'essentiel de leurs n-grammes.
+
+    La similarité est donc purement lexicale : elle rapproche deux formulations
+    voisines, pas deux sens (une négation ne change presque pas le vecteur).
+
+    Args:
+        question (str): La question en langage naturel.
+        dim (int): Taille du vecteur.
+
+    Returns:
+        numpy.ndarray: Vecteur float32 de norme 1 (nul pour une question vide).
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in _WORD_RE.findall(normalize_question(question)):
+        features = [f"w:{word}"]
+        padded = f"#{word}#"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        for feature in features:
+            vector[zlib.crc32(feature.encode("utf-8")) % dim] += 1.0
+    # Fréquences sous-linéaires : une question répétitive ne domine pas la similarité
+    np.sqrt(vector, out=vector)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def entity_surface(iri_name):
+    """Forme de surface d'un nom d'entité DBpedia ("John_F._Kennedy" → "john f. kennedy")."""
+    name = unquote(iri_name).replace("\\", "").replace("_", " ")
+    if name.count(")") > name.count("("):
+        # Parenthèse fermante de FILTER(...) collée au nom
+        name = name[:name.rindex(")")]
+    # Les précisions entre parenthèses ("Cannes (film)") n'apparaissent pas dans la question
+    name = re.sub(r"\s*\(.*\)$", "", name)
+    return normalize_question(name)
+
+def _contains(question, surface):
+    return re.search(rf"(?<!\w){re.escape(surface)}(?!\w)", question) is not None
+
+def _mask(question, surfaces):
+    """Question normalisée sans ses entités (il reste la relation demandée)."""
+    for surface in surfaces:
+        question = re.sub(rf"(?<!\w){re.escape(surface)}(?!\w)", " ", question)
+    return question
+
+def relation_words(masked_question):
+    """
+    Mots porteurs de la relation d'une question sans ses entités (voir _mask).
+
+    Les mots outils (STOP_WORDS) sont ignorés ; une négation, y compris contractée
+    ("isn't", "doesn't"), donne le mot "not".
+
+    Returns:
+        frozenset: Les mots restants.
+    """
+    words = set()
+    for word in _WORD_RE.findall(masked_question):
+        word = word.strip("'.-")
+        if word.endswith("n't"):
+            words.add("not")
+            word = word[:-3]
+        if word in NEGATION_WORDS:
+            words.add("not")
+        elif word and word not in STOP_WORDS:
+            words.add(word)
+    return frozenset(words)
+
+def question_entities(question, query, entity_mappings=None):
+    """
+    Formes de surface des entités d'une paire question → requête.
+
+    Les entités sont lues dans entity_mappings si la paire en a, sinon déduites des
+    IRIs dbr: de la requête. Chacune doit apparaître telle quelle dans la question.
+
+    Returns:
+        tuple: Les formes de surface normalisées, ou None si une entité de la requête
+        ne se retrouve pas dans la question (la paire ne peut pas être réutilisée).
+    """
+    normalized = normalize_question(question)
+    if entity_mappings:
+        surfaces = {normalize_question(surface) for surface in entity_mappings}
+    else:
+        surfaces = {entity_surface(name) for name in _ENTITY_RE.findall(query)}
+    surfaces.discard("")
+    if not surfaces or not all(_contains(normalized, surface) for surface in surfaces):
+        return None
+    return tuple(sorted(surfaces))
+
+class SemanticQuestionCache:
+    """
+    Index vectoriel des questions déjà résolues, pour réutiliser leur requête SPARQL
+    sur une paraphrase sans passer par le tagger, le classifieur ni le LLM.
+
+    Une entrée n'est réutilisée que si toutes ses entités (formes de surface) apparaissent
+    dans la nouvelle question, si les deux questions sans leurs entités ont les mêmes mots
+    porteurs (relation_words, négation comprise) et si leur similarité cosinus dépasse
+    le seuil : "which is the currency of China" réutilise la requête de "what is the
+    currency of China", pas celle de "what is the currency of Japan" ni celle de
+    "what is not the currency of China".
+
+    Les vecteurs sont lexicaux (voir embed_question) : c'est une reconnaissance des
+    reformulations proches, pas des synonymes ("spouse" / "wife" ne correspondent pas).
+
+    La recherche est exacte (produit matriciel NumPy) ; à partir de lsh_min_size entrées,
+    un index LSH (hyperplans aléatoires) restreint les candidats avant le calcul exact.
+    """
+
+    def __init__(self, threshold=DEFAULT_SIMILARITY_THRESHOLD, dim=DEFAULT_VECTOR_DIM,
+                 lsh_min_size=DEFAULT_LSH_MIN_SIZE, candidates=DEFAULT_CANDIDATES):
+        self.threshold = threshold
+        self.dim = dim
+        self.lsh_min_size = lsh_min_size
+        self.candidates = candidates
+        self.entries = []
+        self._known = set()
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        self._lock = threading.Lock()
+        self._lsh = None
+        self._planes = np.random.default_rng(0).standard_normal((LSH_TABLES, LSH_BITS, dim)).astype(np.float32)
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, question, query, entity_mappings=None):
+        """
+        Ajoute une paire question → requête vérifiée.
+
+        Returns:
+            bool: False si la paire est ignorée (déjà présente, requête vide ou en erreur,
+            entités introuvables dans la question).
+        """
+        if not query or "ERROR" in query:
+            return False
+        entities = question_entities(question, query, entity_mappings)
+        if entities is None:
+            return False
+        key = (normalize_question(question), query)
+        vector = embed_question(question, self.dim)
+        masked = _mask(normalize_question(question), entities)
+        relation = embed_question(masked, self.dim)
+        with self._lock:
+            if key in self._known:
+                return False
+            self._known.add(key)
+            if len(self.entries) == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+            self._vectors[len(self.entries)] = vector
+            self.entries.append({"question": question, "query": query, "entities": entities,
+                                 "relation": relation, "words": relation_words(masked)})
+            if self._lsh is not None:
+                self._index(len(self.entries) - 1, vector)
+        return True
+
+    def load(self, path):
+        """
+        Charge un fichier de résultats : test_results.json (question, query, valid, executed)
+        ou improved_results.json (question, sparql_query, entity_mappings). Les entrées
+        marquées invalides ou non exécutées sont ignorées.
+
+        Returns:
+            int: Le nombre de paires ajoutées.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        added = 0
+        for item in data:
+            if not isinstance(item, dict) or not item.get("question"):
+                continue
+            if not item.get("valid", True) or not item.get("executed", True):
+                continue
+            query = item.get("query") or item.get("sparql_query")
+            added += self.add(item["question"], query, item.get("entity_mappings"))
+        return added
+
+    def _index(self, position, vector):
+        for table, planes in zip(self._lsh, self._planes):
+            table.setdefault(_signature(planes, vector), []).append(position)
+
+    def _candidates(self, vector):
+        """Positions à comparer : toutes, ou celles des mêmes seaux LSH pour un gros index."""
+        size = len(self.entries)
+        if size < self.lsh_min_size:
+            return None
+        if self._lsh is None:
+            self._lsh = [{} for _ in range(LSH_TABLES)]
+            for position in range(size):
+                self._index(position, self._vectors[position])
+        positions = set()
+        for table, planes in zip(self._lsh, self._planes):
+            positions.update(table.get(_signature(planes, vector), ()))
+        return np.fromiter(positions, dtype=np.int64, count=len(positions))
+
+    def lookup(self, question):
+        """
+        Cherche une question déjà résolue équivalente.
+
+        Les plus proches voisins sur la question entière sont filtrés sur les entités et
+        sur les mots porteurs de la relation, puis comparés sans leurs entités : c'est la
+        relation demandée ("founder" / "CEO") qui doit dépasser le seuil, pas le nom
+        propre partagé.
+
+        Returns:
+            dict: {"question", "query", "entities", "similarity"} de l'entrée réutilisable
+            la plus proche, ou None.
+        """
+        vector = embed_question(question, self.dim)
+        normalized = normalize_question(question)
+        best = None
+        with self._lock:
+            positions = self._candidates(vector)
+            if positions is None:
+                positions = np.arange(len(self.entries))
+            scores = self._vectors[positions] @ vector
+            for i in np.argsort(-scores)[:self.candidates]:
+                entry = self.entries[positions[i]]
+                if not all(_contains(normalized, surface) for surface in entry["entities"]):
+                    continue
+                masked = _mask(normalized, entry["entities"])
+                if relation_words(masked) != entry["words"]:
+                    continue
+                similarity = float(entry["relation"] @ embed_question(masked, self.dim))
+                if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                    best = dict(entry, similarity=similarity)
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        del best["relation"], best["words"]
+        return best
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "approximate": self._lsh is not None}
+
+def _signature(planes, vector):
+    return ((planes @ vector) > 0).tobytes()
+
+def load_semantic_cache(paths=DEFAULT_SEMANTIC_SOURCES, threshold=DEFAULT_SIMILARITY_THRESHOLD):
+    """Construit un SemanticQuestionCache à partir des fichiers de résultats donnés."""
+    cache = SemanticQuestionCache(threshold)
+    for path in paths:
+        cache.load(path)
+    return cache
@@ -1,25 +1,55 @@
-import requests
-from openai import OpenAI
-import re
 import json
 from datetime import datetime
+from functools import lru_cache
 import sparql_utils
+from sparql_cache import get_result_cache, configure_result_cache
+from query_guard import guard_query, configure_guard, DEFAULT_QUERY_LIMIT
+from llm_cache import get_llm_cache, configure_llm_cache
+from rate_limiter import TokenBucket
+from jsonl_checkpoint import JsonlCheckpoint, read_jsonl
+from concurrent.futures import ThreadPoolExecutor
+from endpoint_client import DBPEDIA_ENDPOINT, SparqlEndpointError, get_default_client, configure_endpoint
 import os
 import argparse
 
 # 1) Renseignez votre clé OpenAI
-client = OpenAI(api_key="")
+OPENAI_API_KEY = ""
 
-DBPEDIA_SPARQL_ENDPOINT = "https://dbpedia.org/sparql"
+@lru_cache(maxsize=None)
+def get_openai_client():
+    """
+    Crée le client OpenAI à la première utilisation seulement : importer ce module
+    ne charge ni le SDK OpenAI ni le client.
+    """
+    from openai import OpenAI
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+DBPEDIA_SPARQL_ENDPOINT = DBPEDIA_ENDPOINT
+
+# Modèle utilisé et version du prompt : tous deux font partie de la clé du cache LLM,
+# incrémentez PROMPT_VERSION à chaque modification de build_prompt ou de SYSTEM_PROMPT
+LLM_MODEL = "gpt-4o"
+#LLM_MODEL = "o3-mini"
+PROMPT_VERSION = "1"
+SYSTEM_PROMPT = "You are an assistant that converts natural language questions into SPARQL. Your response must be a valid SPARQL query."
 
-def generate_sparql_from_nlp(question: str) -> str:
+# Mode hors ligne : les requêtes générées ne viennent que du cache LLM (aucun appel API)
+LLM_OFFLINE = False
+
+# Limiteur des appels à l'API (None : pas de limite), voir configure_llm_rate_limit
+_llm_rate_limiter = None
+
+def configure_llm_rate_limit(requests_per_minute, burst=None):
+    """Limite le nombre d'appels à l'API OpenAI par minute (None ou 0 : aucune limite)."""
+    global _llm_rate_limiter
+    _llm_rate_limiter = TokenBucket(requests_per_minute / 60.0, burst) if requests_per_minute else None
+
+def build_prompt(question: str) -> str:
     """
-    Envoie la question et un prompt spécial à l'API OpenAI ChatCompletion
-    pour générer une requête SPARQL correspondant à la question NLP.
+    Prompt modèle : instructions au modèle pour générer du SPARQL.
+    Vous pouvez personnaliser ce prompt selon vos besoins (pensez à PROMPT_VERSION).
     """
-    # Prompt modèle : instructions au modèle pour générer du SPARQL
-    # Vous pouvez personnaliser ce prompt selon vos besoins.
-    prompt = f"""
+    return f"""
     Role: You are an assistant that converts natural language questions (in English) into valid SPARQL queries for DBpedia.
 
     Instructions:
@@ -65,90 +95,155 @@ def generate_sparql_from_nlp(question: str) -> str:
     "{question}"
     """
 
+def generate_sparql_from_nlp(question: str, use_cache: bool = True) -> str:
+    """
+    Envoie la question et un prompt spécial à l'API OpenAI ChatCompletion
+    pour générer une requête SPARQL correspondant à la question NLP.
+    Les réponses passent par le cache LLM (voir llm_cache) : une question déjà posée
+    avec le même modèle et la même version de prompt ne rappelle pas l'API.
+    """
+    cache = get_llm_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(question, LLM_MODEL, PROMPT_VERSION)
+        if cached is not None:
+            return cached["completion"]
+    if LLM_OFFLINE:
+        print("Mode hors ligne : aucune requête en cache pour cette question.")
+        return ""
+
+    if _llm_rate_limiter is not None:
+        # Attend un jeton : les réponses en cache ne consomment pas de jeton
+        _llm_rate_limiter.acquire()
+
     try:
         # Appel à l'API OpenAI avec le nouveau client
-        response = client.chat.completions.create(
-            #model="o3-mini",
-            model="gpt-4o",
+        response = get_openai_client().chat.completions.create(
+            model=LLM_MODEL,
             messages=[
                 {
                     "role": "system",
-                    "content": "You are an assistant that converts natural language questions into SPARQL. Your response must be a valid SPARQL query."
+                    "content": SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": build_prompt(question)
                 }
             ],
         )
         # Récupération du texte généré
         generated_text = response.choices[0].message.content
-        return generated_text
     except Exception as e:
         print("Erreur lors de l'appel à l'API OpenAI:", e)
         return ""
 
+    if cache is not None:
+        cache.put(question, LLM_MODEL, PROMPT_VERSION, generated_text, sparql_utils.clean_sparql_query(generated_text or ""))
+    return generated_text
+
 def execute_sparql_query(query: str) -> list: 
-    """ Envoie la requête SPARQL à l'endpoint DBpedia et renvoie les résultats (format JSON). """ 
-    try: 
-        # Effectuer la requête GET avec les paramètres SPARQL + format JSON 
-        response = requests.get(DBPEDIA_SPARQL_ENDPOINT, 
-                              params={"query": query, "format": "json"}, 
-                              timeout=30) # secondes
-        # Vérifier la validité de la réponse 
-        response.raise_for_status() 
-        data = response.json()
-        
-        # Vérifier si c'est une requête ASK (retourne un booléen)
-        if "boolean" in data:
-            # Pour les requêtes ASK, on retourne directement le booléen
-            return [{"boolean": {"value": "true" if data["boolean"] else "false"}}]
-        
-        # Pour les requêtes SELECT normales
-        return data.get("results", {}).get("bindings", [])
-    except Exception as e:
-        print("Erreur lors de l'exécution de la requête SPARQL :", e)
-        print("Réponse reçue:", response.text if 'response' in locals() else "Pas de réponse")
+    """ Envoie la requête SPARQL à l'endpoint DBpedia et renvoie les résultats (format JSON). 
+    La requête passe par le client HTTP partagé (connexions keep-alive) et les réponses
+    par le même cache que sparql_utils.execute_sparql_query. """ 
+    cache = get_result_cache()
+    outcome = cache.get(query) if cache is not None else None
+    if outcome is None:
+        try: 
+            # Requête GET (ou POST si elle est longue) avec les paramètres SPARQL + format JSON 
+            outcome = {"success": True, "results": get_default_client().query(query)}
+        except SparqlEndpointError as e:
+            # Le message contient le statut HTTP et le corps de la réponse éventuelle
+            print("Erreur lors de l'exécution de la requête SPARQL :", e)
+            outcome = {"success": False, "error": str(e), "status": e.status}
+        if cache is not None:
+            cache.put(query, outcome)
+
+    if not outcome["success"]:
         return []
+    data = outcome["results"]
 
-def process_single_question(question: str):
-    """Traite une seule question et retourne les résultats"""
-    print(f"\n=== Question : {question} ===")
+    # Vérifier si c'est une requête ASK (retourne un booléen)
+    if "boolean" in data:
+        # Pour les requêtes ASK, on retourne directement le booléen
+        return [{"boolean": {"value": "true" if data["boolean"] else "false"}}]
+    
+    # Pour les requêtes SELECT normales
+    return data.get("results", {}).get("bindings", [])
+
+def process_single_question(question: str, verbose: bool = True, cancelled=None):
+    """Traite une seule question et retourne les résultats
+    (verbose=False : aucun affichage, pour le traitement concurrent d'un fichier).
+    cancelled (threading.Event) : s'il est levé avant l'appel au LLM ou avant l'envoi
+    de la requête, la question est abandonnée (exécution spéculative de main.py)"""
+    log = print if verbose else (lambda *args, **kwargs: None)
+    log(f"\n=== Question : {question} ===")
+    if cancelled is not None and cancelled.is_set():
+        return None, None
     
     # Étape 1 : Génération de la requête SPARQL via l'API OpenAI
     sparql_query = generate_sparql_from_nlp(question)
-    print("\n--- Requête SPARQL générée ---\n")
-    print(sparql_query)
+    log("\n--- Requête SPARQL générée ---\n")
+    log(sparql_query)
 
     # Étape 2 : Nettoyer la requête SPARQL (extraire du code markdown si nécessaire)
     sparql_query_clean = sparql_utils.clean_sparql_query(sparql_query)
-    print("\n--- Requête SPARQL nettoyée ---\n")
-    print(sparql_query_clean)
+    log("\n--- Requête SPARQL nettoyée ---\n")
+    log(sparql_query_clean)
     
-    # Étape 3 : Valider la requête SPARQL
-    is_valid, validation_message = sparql_utils.validate_sparql_query(sparql_query_clean)
-    print(f"\n--- Validation de la requête ---\n{validation_message}")
+    # Garde-fou : requêtes parcourant tout le graphe rejetées, LIMIT ajouté si absent
+    sparql_query_clean, rejection = guard_query(sparql_query_clean)
+    if rejection:
+        log(f"\n{rejection}. Arrêt.")
+        return None, None
     
-    if not is_valid:
-        print("La requête n'est pas valide. Arrêt.")
+    if cancelled is not None and cancelled.is_set():
+        log("\nQuestion abandonnée (une autre réponse l'a emporté). Arrêt.")
         return None, None
-
-    # Étape 4 : Exécution de la requête SPARQL
-    query_results = sparql_utils.execute_sparql_query(sparql_query_clean)
     
-    # Étape 5 : Extraction et affichage des résultats
-    formatted_results = sparql_utils.extract_results_for_display(query_results)
+    # Étapes 3 et 4 : Validation et exécution de la requête SPARQL (un seul aller-retour)
+    outcome = sparql_utils.run_sparql_query(sparql_query_clean)
+    log(f"\n--- Validation de la requête ---\n{outcome['validation_message']}")
     
-    if not query_results["success"]:
-        print("\nErreur lors de l'exécution de la requête.")
-        print(formatted_results[0])
-        return sparql_query_clean, None
+    if not outcome["valid"]:
+        log("La requête n'est pas valide. Arrêt.")
+        return None, None
+
+    # Étape 5 : Affichage des résultats
+    log("\n--- Résultats obtenus ---")
+    for idx, result in enumerate(outcome["formatted_results"], start=1):
+        log(f"{idx}. {result}")
     
+    return sparql_query_clean, outcome["results"]
+
+def stream_single_question(question: str, page_size=sparql_utils.DEFAULT_PAGE_SIZE):
+    """Traite une question en affichant les résultats au fur et à mesure de leur
+    arrivée (pages LIMIT/OFFSET analysées en streaming), sans les garder en mémoire.
+    Retourne la requête nettoyée et le nombre de lignes affichées."""
+    print(f"\n=== Question : {question} ===")
+    sparql_query_clean = sparql_utils.clean_sparql_query(generate_sparql_from_nlp(question))
+    print("\n--- Requête SPARQL nettoyée ---\n")
+    print(sparql_query_clean)
+
+    # Pas de LIMIT ajouté ici : la pagination borne déjà chaque requête
+    sparql_query_clean, rejection = guard_query(sparql_query_clean, limit=0)
+    if rejection:
+        print(f"\n{rejection}. Arrêt.")
+        return None, 0
+
+    # Seule la syntaxe est vérifiée : les résultats arrivent avec l'exécution
+    valid, message = sparql_utils.validate_sparql_query(sparql_query_clean, offline=True)
+    print(f"\n--- Validation de la requête ---\n{message}")
+    if not valid:
+        print("La requête n'est pas valide. Arrêt.")
+        return None, 0
+
     print("\n--- Résultats obtenus ---")
-    for idx, result in enumerate(formatted_results, start=1):
-        print(f"{idx}. {result}")
-    
-    return sparql_query_clean, query_results["results"]
+    count = 0
+    try:
+        for count, result in enumerate(sparql_utils.iter_formatted_results(sparql_query_clean, page_size), start=1):
+            print(f"{count}. {result}", flush=True)
+    except SparqlEndpointError as e:
+        print("Erreur lors de l'exécution de la requête SPARQL :", e)
+    return sparql_query_clean, count
 
 def process_question_interactive(question=None):
     """
@@ -188,12 +283,23 @@ def process_question_interactive(question=None):
     print(f"\nLes résultats ont été sauvegardés dans: {output_filename}")
     return output_filename
 
-def process_file_questions(file_path):
+def process_file_questions(file_path, workers=1, verbose=None, output_file=None, resume=False):
     """
-    Process all questions from a file and save the results to a JSON file.
+    Process all questions from a file and stream the results to a JSONL file.
+    
+    Each answered question is appended as soon as it finishes ({"index", "question",
+    "requete_sparql", "resultats"}, index = line number) and every finished question,
+    answered or not, is recorded in the checkpoint file `<output_file>.done`, which is
+    removed once all the questions are done. The summary covers the resumed questions too.
     
     Args:
         file_path (str): Path to the file containing questions, one per line
+        workers (int): Number of questions processed concurrently; LLM calls are
+            throttled by the limiter set with configure_llm_rate_limit
+        verbose (bool, optional): Print the full trace of each question
+            (default: only when questions are processed one at a time)
+        output_file (str, optional): JSONL results file (default: resultats_sparql_<date>.jsonl)
+        resume (bool): Skip the questions already recorded in the checkpoint of output_file
     
     Returns:
         str: Path to the saved results file
@@ -211,38 +317,59 @@ def process_file_questions(file_path):
         print(f"Erreur lors de la lecture du fichier: {e}")
         return None
     
-    # Initialize counters and results data
-    total_questions = 0
+    workers = max(1, workers)
+    if verbose is None:
+        verbose = workers == 1
+    output_filename = output_file or f"resultats_sparql_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    
+    # Skip empty lines, keep the line numbers for the progress messages and the checkpoint
+    numbered = [(i, question.strip()) for i, question in enumerate(questions, 1) if question.strip()]
+    
+    checkpoint = JsonlCheckpoint(output_filename, resume)
+    pending = [(i, question) for i, question in numbered if i not in checkpoint.done]
+    
+    # Initialize counters, with the questions of the interrupted run (only answered ones have a record)
+    total_questions = len(numbered) - len(pending)
     successful_queries = 0
-    results_data = {
-        "date_execution": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "resultats": []
-    }
+    if total_questions:
+        print(f"Reprise : {total_questions} question(s) déjà traitée(s) ignorée(s)")
+        numbers = {i for i, _ in numbered}
+        successful_queries = sum(1 for record in read_jsonl(output_filename) if record.get("index") in numbers)
     
-    # Process each question
-    for i, question in enumerate(questions, 1):
-        question = question.strip()
-        if not question:  # Skip empty lines
-            continue
-        
-        print(f"\nTraitement de la question {i}: {question}")
-        total_questions += 1
-        query, results = process_single_question(question)
-        
-        if results:
-            successful_queries += 1
-            results_data["resultats"].append({
-                "question": question,
-                "requete_sparql": query,
-                "resultats": results
-            })
-        
-        print("\n" + "="*50 + "\n")  # Separator between questions
+    def process(item):
+        i, question = item
+        if verbose:
+            print(f"\nTraitement de la question {i}: {question}")
+        return process_single_question(question, verbose=verbose)
     
-    # Save results to JSON file
-    output_filename = f"resultats_sparql_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(output_filename, "w", encoding="utf-8") as f:
-        json.dump(results_data, f, ensure_ascii=False, indent=2)
+    # Questions are processed concurrently, results come back in input order
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for n, ((i, question), (query, results)) in enumerate(zip(pending, executor.map(process, pending)), 1):
+            total_questions += 1
+            
+            record = None
+            if results:
+                successful_queries += 1
+                record = {
+                    "index": i,
+                    "question": question,
+                    "requete_sparql": query,
+                    "resultats": results
+                }
+            checkpoint.write(i, record)
+            
+            if verbose:
+                print("\n" + "="*50 + "\n")  # Separator between questions
+            else:
+                status = "OK" if results else "échec"
+                print(f"[{n}/{len(pending)}] Question {i} ({status}): {question}")
+    finally:
+        # Ctrl-C : ne pas lancer les questions encore en attente
+        executor.shutdown(wait=True, cancel_futures=True)
+        checkpoint.close()
+    # Every question is done: the results file is final, the checkpoint is no longer needed
+    checkpoint.finish()
     
     # Display summary
     print(f"\nRésumé de l'exécution:")
@@ -265,15 +392,43 @@ def main():
     input_group = parser.add_mutually_exclusive_group()
     input_group.add_argument('-q', '--question', type=str, help='Question unique à traiter')
     input_group.add_argument('-f', '--file', type=str, help='Chemin vers un fichier contenant des questions (une par ligne)')
+    parser.add_argument('--no-cache', action='store_true', help='Désactive le cache des résultats SPARQL (actif par défaut : fichier sparql_cache.sqlite du dossier courant)')
+    parser.add_argument('--stream', action='store_true', help='Avec -q : affiche les résultats au fil de l\'eau, page par page, sans sauvegarde')
+    parser.add_argument('--page-size', type=int, default=sparql_utils.DEFAULT_PAGE_SIZE, help='Taille des pages LIMIT/OFFSET en mode --stream')
+    parser.add_argument('--workers', type=int, default=1, help='Avec -f : nombre de questions traitées en parallèle')
+    parser.add_argument('--llm-rpm', type=float, default=None, help='Nombre maximal d\'appels à l\'API OpenAI par minute')
+    parser.add_argument('--verbose', action='store_true', help='Avec -f et --workers > 1 : affiche le détail de chaque question')
+    parser.add_argument('-o', '--output', type=str, help='Avec -f : fichier JSONL des résultats (resultats_sparql_<date>.jsonl par défaut)')
+    parser.add_argument('--resume', action='store_true', help='Avec -f et -o : reprend un traitement interrompu en sautant les questions déjà traitées')
+    parser.add_argument('--no-llm-cache', action='store_true', help='Désactive le cache des requêtes générées par le LLM')
+    parser.add_argument('--offline', action='store_true', help='Rejoue les requêtes générées depuis le cache LLM, sans appel API (avec le cache SPARQL ou --endpoint local:..., aucun accès réseau)')
+    parser.add_argument('--max-rows', type=int, default=DEFAULT_QUERY_LIMIT, help='LIMIT ajouté aux SELECT générés sans LIMIT (0 : aucun)')
+    parser.add_argument('--endpoint', type=str, help='Endpoint SPARQL : URL(s) http(s) séparées par des virgules ou "local:fichier.nt[,store.pickle]" (DBpedia par défaut)')
     
     args = parser.parse_args()
+    if args.resume and not args.output:
+        parser.error("--resume needs --output (the JSONL file of the interrupted run)")
+    if args.no_cache:
+        configure_result_cache(None)
+    if args.endpoint:
+        configure_endpoint(args.endpoint)
+    configure_guard(args.max_rows)
+    if args.no_llm_cache:
+        configure_llm_cache(None)
+    if args.offline:
+        global LLM_OFFLINE
+        LLM_OFFLINE = True
+    if args.llm_rpm:
+        configure_llm_rate_limit(args.llm_rpm)
     
-    if args.question:
+    if args.question and args.stream:
+        stream_single_question(args.question, args.page_size)
+    elif args.question:
         # Process a single question provided as argument
         process_question_interactive(args.question)
     elif args.file:
         # Process questions from a file
-        process_file_questions(args.file)
+        process_file_questions(args.file, args.workers, True if args.verbose else None, args.output, args.resume)
     else:
         # No arguments provided, show menu for interactive use
         print("\nTraitement de questions NLP en SPARQL")
@@ -0,0 +1,177 @@
+import re
+
+from sparql_cache import get_result_cache, cache_key
+from sparql_syntax import DBPEDIA_PREFIXES
+
+DEFAULT_CHUNK_SIZE = 50
+# Nombre maximal de lignes renvoyées par DBpedia (ResultSetMaxRows de Virtuoso) :
+# un lot qui l'atteint est peut-être tronqué et ses requêtes sont renvoyées une par une
+MAX_BATCH_ROWS = 10000
+
+# Noms locaux identiques sous forme préfixée et sous forme d'IRI (pas d'échappement)
+_LOCAL = r"([\w\-]+)"
+
+# Formes produites par generate_sparql_query pour les templates A, B et D (template_map.json)
+_SHAPES = {
+    "A": re.compile(rf"^\s*SELECT\s+\?ans\s+WHERE\s*\{{\s*dbr:{_LOCAL}\s+dbo:{_LOCAL}\s+\?ans\s*\.?\s*\}}\s*$", re.IGNORECASE),
+    "B": re.compile(rf"^\s*SELECT\s+\?ans\s+WHERE\s*\{{\s*\?ans\s+dbo:{_LOCAL}\s+dbr:{_LOCAL}\s*\.?\s*\}}\s*$", re.IGNORECASE),
+    "D": re.compile(rf"^\s*ASK\s+WHERE\s*\{{\s*dbr:{_LOCAL}\s+dbo:{_LOCAL}\s+dbr:{_LOCAL}\s*\.?\s*\}}\s*$", re.IGNORECASE),
+}
+
+def _resource(local):
+    return f"<{DBPEDIA_PREFIXES['dbr']}{local}>"
+
+def _property(local):
+    return f"<{DBPEDIA_PREFIXES['dbo']}{local}>"
+
+def parse_template_query(query):
+    """
+    Reconnaît une requête de template A, B ou D.
+
+    Returns:
+        tuple: (shape, predicate_iri, key) où key est l'IRI de l'entité (A, B)
+        ou le couple (sujet, objet) (D) ; None si la requête ne peut pas être groupée.
+    """
+    for shape, pattern in _SHAPES.items():
+        match = pattern.match(query)
+        if not match:
+            continue
+        if shape == "A":
+            subject, predicate = match.groups()
+            return shape, _property(predicate), _resource(subject)
+        if shape == "B":
+            predicate, obj = match.groups()
+            return shape, _property(predicate), _resource(obj)
+        subject, predicate, obj = match.groups()
+        return shape, _property(predicate), (_resource(subject), _resource(obj))
+    return None
+
+def build_batch_query(shape, predicate, keys):
+    """
+    Réécrit un groupe de requêtes de même forme et de même prédicat en une seule
+    requête VALUES, la variable liée étant projetée pour pouvoir séparer les résultats.
+    """
+    if shape == "A":
+        values = " ".join(keys)
+        return f"SELECT ?s ?ans WHERE {{ VALUES ?s {{ {values} }} ?s {predicate} ?ans . }}"
+    if shape == "B":
+        values = " ".join(keys)
+        return f"SELECT ?o ?ans WHERE {{ VALUES ?o {{ {values} }} ?ans {predicate} ?o . }}"
+    # Un ASK par couple devient un SELECT des couples qui existent
+    values = " ".join(f"({s} {o})" for s, o in keys)
+    return f"SELECT DISTINCT ?s ?o WHERE {{ VALUES (?s ?o) {{ {values} }} ?s {predicate} ?o . }}"
+
+def split_batch_results(shape, keys, results):
+    """
+    Sépare la réponse d'une requête VALUES en réponses individuelles, au format
+    JSON qu'aurait renvoyé l'endpoint pour chaque requête d'origine.
+
+    Returns:
+        dict: key -> JSON de résultats SPARQL
+    """
+    bindings = results.get("results", {}).get("bindings", [])
+    if shape == "D":
+        found = {(row["s"]["value"], row["o"]["value"]) for row in bindings if "s" in row and "o" in row}
+        return {key: {"head": {}, "boolean": (key[0][1:-1], key[1][1:-1]) in found} for key in keys}
+
+    bound = "s" if shape == "A" else "o"
+    rows = {key: [] for key in keys}
+    for row in bindings:
+        value = row.get(bound, {}).get("value")
+        key = f"<{value}>"
+        if key in rows and "ans" in row:
+            rows[key].append({"ans": row["ans"]})
+    return {key: {"head": {"vars": ["ans"]}, "results": {"bindings": rows[key]}} for key in keys}
+
+class BatchedSparqlExecutor:
+    """
+    Exécute un lot de requêtes en regroupant celles des templates A, B et D qui ne
+    diffèrent que par leurs entités : une requête VALUES par (forme, prédicat) et par
+    paquet de chunk_size entités, au lieu d'une requête par question.
+
+    Les autres requêtes, et celles d'un lot en erreur ou peut-être tronqué
+    (MAX_BATCH_ROWS), sont exécutées individuellement. Les résultats ont le format de
+    sparql_utils.execute_sparql_query et sont enregistrés dans le cache de résultats
+    sous la requête d'origine.
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, concurrency=1, use_cache=True):
+        self.chunk_size = max(1, chunk_size)
+        self.concurrency = concurrency
+        self.use_cache = use_cache
+        self.requests = 0
+
+    def _execute(self, queries, use_cache):
+        """Exécute des requêtes indépendantes (en parallèle si concurrency > 1)."""
+        self.requests += len(queries)
+        if self.concurrency and self.concurrency > 1:
+            from async_sparql import AsyncSparqlExecutor
+            return AsyncSparqlExecutor(concurrency=self.concurrency, use_cache=use_cache).run(queries)
+        from sparql_utils import execute_sparql_query
+        return [execute_sparql_query(query, use_cache=use_cache) for query in queries]
+
+    def run(self, queries):
+        """
+        Returns:
+            list: Les résultats, dans l'ordre des requêtes.
+        """
+        cache = get_result_cache() if self.use_cache else None
+        outcomes = {}
+        groups = {}
+        singles = {}
+        for query in queries:
+            key = cache_key(query)
+            if key in outcomes or key in singles:
+                continue
+            cached = cache.get(query) if cache is not None else None
+            if cached is not None:
+                outcomes[key] = cached
+                continue
+            parsed = parse_template_query(query)
+            if parsed is None:
+                singles[key] = query
+                continue
+            shape, predicate, entity = parsed
+            members = groups.setdefault((shape, predicate), {})
+            if entity in members:
+                # Même requête écrite autrement : elle partagera le résultat
+                members[entity].append(query)
+            else:
+                members[entity] = [query]
+
+        batches = []
+        for (shape, predicate), members in groups.items():
+            keys = list(members)
+            for start in range(0, len(keys), self.chunk_size):
+                chunk = keys[start:start + self.chunk_size]
+                batches.append((shape, predicate, chunk, members))
+
+        batch_outcomes = self._execute([build_batch_query(s, p, chunk) for s, p, chunk, _ in batches], use_cache=False)
+        for (shape, predicate, chunk, members), batch in zip(batches, batch_outcomes):
+            rows = batch.get("results", {}).get("results", {}).get("bindings", []) if batch["success"] else []
+            if not batch["success"] or len(rows) >= MAX_BATCH_ROWS:
+                for entity in chunk:
+                    query = members[entity][0]
+                    singles[cache_key(query)] = query
+                continue
+            for entity, results in split_batch_results(shape, chunk, batch["results"]).items():
+                outcome = {"success": True, "results": results}
+                for query in members[entity]:
+                    outcomes[cache_key(query)] = outcome
+                    if cache is not None:
+                        cache.put(query, outcome)
+
+        # Les requêtes individuelles passent elles-mêmes par le cache
+        single_outcomes = self._execute(list(singles.values()), use_cache=self.use_cache)
+        outcomes.update(zip(singles, single_outcomes))
+
+        results = []
+        for query in queries:
+            key = cache_key(query)
+            if key not in outcomes:
+                # Variante d'une requête renvoyée individuellement après l'échec de son lot
+                parsed = parse_template_query(query)
+                representative = groups[parsed[:2]][parsed[2]][0]
+                key = cache_key(representative)
+            results.append(outcomes[key])
+        return results
@@ -0,0 +1,93 @@
+import threading
+
+from sqlite_cache import SQLiteCache
+from sparql_syntax import canonicalize_sparql_query
+
+# Le cache est actif par défaut : fichier créé dans le dossier courant au premier appel
+# de get_result_cache() (configure_result_cache(None) ou --no-cache le désactive)
+DEFAULT_SPARQL_CACHE_PATH = "sparql_cache.sqlite"
+DEFAULT_RESULT_TTL = 24 * 3600     # résultats non vides (secondes)
+DEFAULT_NEGATIVE_TTL = 10 * 60     # SELECT sans résultat et requêtes refusées (4xx) (secondes)
+DEFAULT_SPARQL_CACHE_SIZE = 200000
+
+def cache_key(query):
+    """Clé du cache : requête canonique, noms de variables conservés."""
+    return canonicalize_sparql_query(query, rename_variables=False)
+
+def is_definite_outcome(outcome):
+    """
+    Vrai si la réponse ne dépend pas de l'état du réseau ou du serveur : un succès, ou
+    un refus de la requête elle-même (HTTP 4xx, "status" de l'outcome, hors 408 et 429).
+    Délais dépassés, erreurs réseau et 5xx ne sont jamais mis en cache.
+    """
+    if outcome.get("success"):
+        return True
+    status = outcome.get("status")
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+def is_negative_outcome(outcome):
+    """Vrai pour une erreur ou un SELECT sans aucun résultat."""
+    if not outcome.get("success"):
+        return True
+    results = outcome.get("results") or {}
+    if "boolean" in results:
+        return False
+    return not results.get("results", {}).get("bindings")
+
+class SparqlResultCache:
+    """
+    Cache disque des réponses de l'endpoint SPARQL, indexé par requête canonique
+    (voir sparql_syntax.canonicalize_sparql_query ; les variables gardent leur nom
+    puisqu'elles apparaissent dans les bindings).
+
+    Les valeurs sont au format de sparql_utils.execute_sparql_query :
+    {"success": True, "results": <JSON brut de l'endpoint>} ou
+    {"success": False, "error": ..., "status": <code HTTP ou None>}.
+    Les réponses vides et les requêtes refusées sont gardées moins longtemps (negative_ttl) ;
+    les échecs passagers ne sont pas gardés (voir is_definite_outcome).
+    """
+
+    def __init__(self, path=DEFAULT_SPARQL_CACHE_PATH, ttl=DEFAULT_RESULT_TTL,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL, max_entries=DEFAULT_SPARQL_CACHE_SIZE):
+        self.negative_ttl = negative_ttl
+        self.store = SQLiteCache(path, ttl=ttl, max_entries=max_entries, table="sparql_results")
+
+    def get(self, query):
+        """Retourne le résultat mis en cache pour la requête, ou None."""
+        return self.store.get(cache_key(query))
+
+    def put(self, query, outcome):
+        """Enregistre le résultat d'une exécution (TTL court pour les résultats négatifs, rien pour un échec passager)."""
+        if not is_definite_outcome(outcome):
+            return
+        ttl = self.negative_ttl if is_negative_outcome(outcome) else None
+        self.store.put(cache_key(query), outcome, ttl=ttl)
+
+    def stats(self):
+        return self.store.stats()
+
+_default_cache = None
+_default_lock = threading.Lock()
+_enabled = True
+
+def configure_result_cache(path=DEFAULT_SPARQL_CACHE_PATH, ttl=DEFAULT_RESULT_TTL,
+                           negative_ttl=DEFAULT_NEGATIVE_TTL, max_entries=DEFAULT_SPARQL_CACHE_SIZE):
+    """
+    Configure le cache utilisé par execute_sparql_query ; path=None le désactive.
+
+    Returns:
+        SparqlResultCache: Le nouveau cache (None s'il est désactivé).
+    """
+    global _default_cache, _enabled
+    with _default_lock:
+        _enabled = path is not None
+        _default_cache = SparqlResultCache(path, ttl, negative_ttl, max_entries) if _enabled else None
+        return _default_cache
+
+def get_result_cache():
+    """Retourne le cache partagé (créé au premier appel), ou None s'il est désactivé."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None and _enabled:
+            _default_cache = SparqlResultCache()
+        return _default_cache
@@ -0,0 +1,203 @@
+import re
+import threading
+from functools import lru_cache
+
+# Préfixes prédéfinis sur l'endpoint DBpedia (les requêtes générées ne les déclarent pas)
+DBPEDIA_PREFIXES = {
+    "dbo": "http://dbpedia.org/ontology/",
+    "dbr": "http://dbpedia.org/resource/",
+    "dbp": "http://dbpedia.org/property/",
+    "res": "http://dbpedia.org/resource/",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "owl": "http://www.w3.org/2002/07/owl#",
+    "foaf": "http://xmlns.com/foaf/0.1/",
+    "skos": "http://www.w3.org/2004/02/skos/core#",
+    "dct": "http://purl.org/dc/terms/",
+    "yago": "http://dbpedia.org/class/yago/",
+}
+
+# Le parseur pyparsing de rdflib n'est pas réentrant : une analyse à la fois
+PARSER_LOCK = threading.Lock()
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<comment>\#[^\n]*)
+    | (?P<string>\"\"\"(?:[^\\]|\\.)*?\"\"\"|'''(?:[^\\]|\\.)*?'''|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    | (?P<iri><[^<>"{}|^`\\\s]*>)
+    | (?P<var>[?$][A-Za-z0-9_·À-￿]+)
+    | (?P<langtag>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+    | (?P<pname>(?:[A-Za-zÀ-￿][\w\-.·À-￿]*)?:(?:[\w\-.:%·À-￿]|\\[_~.\-!$&'()*+,;=/?\#@%])*)
+    | (?P<number>[+-]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<punct>\^\^|&&|\|\||!=|<=|>=|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+def tokenize_sparql(query):
+    """
+    Découpe une requête SPARQL en tokens (type, texte), sans les espaces ni les commentaires.
+    Les caractères inattendus sont renvoyés tels quels (type "punct") : la fonction ne lève jamais.
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(query):
+        kind, text = match.lastgroup, match.group(0)
+        if kind in ("ws", "comment"):
+            continue
+        if kind == "pname" and text.endswith(".") and len(text) > 1:
+            # Un nom préfixé ne peut pas finir par "." : c'est la fin du triplet
+            stripped = text.rstrip(".")
+            tokens.append(("pname", stripped))
+            tokens.extend(("punct", ".") for _ in range(len(text) - len(stripped)))
+            continue
+        tokens.append((kind, text))
+    return tokens
+
+def canonicalize_sparql_query(query, rename_variables=True, prefixes=None):
+    """
+    Forme canonique d'une requête SPARQL, utilisable comme clé de cache ou de déduplication.
+
+    - espaces et commentaires normalisés (un espace entre chaque token) ;
+    - mots-clés et fonctions en majuscules (sauf le raccourci "a") ;
+    - "." facultatifs supprimés (avant ou après "}", répétés) ;
+    - déclarations PREFIX supprimées et noms préfixés développés en IRIs complètes
+      (préfixes déclarés puis préfixes DBpedia par défaut) ;
+    - variables renommées ?v0, ?v1... dans l'ordre d'apparition si rename_variables.
+      À désactiver pour une clé de cache de résultats : les noms de variables
+      apparaissent dans les bindings retournés.
+
+    Args:
+        query (str): La requête SPARQL.
+        rename_variables (bool): Renommer les variables selon leur ordre d'apparition.
+        prefixes (dict, optional): Préfixes connus en plus des déclarations (DBPEDIA_PREFIXES par défaut).
+
+    Returns:
+        str: La requête canonique.
+    """
+    tokens = tokenize_sparql(query)
+    namespaces = dict(DBPEDIA_PREFIXES if prefixes is None else prefixes)
+
+    # Déclarations PREFIX p: <iri>
+    kept = []
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if (kind == "word" and text.upper() == "PREFIX" and i + 2 < len(tokens)
+                and tokens[i + 1][0] == "pname" and tokens[i + 1][1].endswith(":") and tokens[i + 2][0] == "iri"):
+            namespaces[tokens[i + 1][1][:-1]] = tokens[i + 2][1][1:-1]
+            i += 3
+            continue
+        kept.append((kind, text))
+        i += 1
+
+    variables = {}
+    output = []
+    for kind, text in kept:
+        if kind == "word":
+            output.append(text if text == "a" else text.lower() if text.lower() in ("true", "false") else text.upper())
+        elif kind == "var":
+            name = text[1:]
+            if rename_variables:
+                name = variables.setdefault(name, f"v{len(variables)}")
+            output.append("?" + name)
+        elif kind == "pname":
+            prefix, _, local = text.partition(":")
+            if prefix in namespaces:
+                # Les échappements du nom local (ex: "\(") disparaissent dans l'IRI
+                local = re.sub(r"\\(.)", r"\1", local)
+                output.append(f"<{namespaces[prefix]}{local}>")
+            else:
+                output.append(text)
+        elif kind == "langtag" and output:
+            # Le tag de langue reste collé à son littéral ("Paris"@en)
+            output[-1] += text.lower()
+        elif kind == "punct" and text == "." and output and output[-1] in (".", "}"):
+            # "." répété ou après un groupe : facultatif
+            continue
+        elif kind == "punct" and text == "}" and output and output[-1] == ".":
+            # "." final d'un groupe facultatif : "{ s p o . }" == "{ s p o }"
+            output[-1] = text
+        else:
+            output.append(text)
+    return " ".join(output)
+
+@lru_cache(maxsize=4096)
+def check_sparql_syntax(query):
+    """
+    Vérifie localement la syntaxe d'une requête avec le parseur SPARQL 1.1 de rdflib,
+    sans aucun appel réseau.
+
+    Args:
+        query (str): La requête SPARQL.
+
+    Returns:
+        tuple: (is_valid, message)
+    """
+    from rdflib.plugins.sparql.parser import parseQuery
+
+    try:
+        with PARSER_LOCK:
+            parseQuery(query)
+    except Exception as e:
+        message = " ".join(str(e).split())
+        return False, f"Syntax error: {message}"
+    return True, "Query is syntactically valid"
+
+def expand_prefixed_names(query, prefixes=None):
+    """
+    Remplace les noms préfixés non déclarés dans la requête (dbr:, dbo:...) par leur IRI
+    complète, sans toucher au reste du texte. Utile pour les moteurs qui, contrairement à
+    DBpedia, ne prédéfinissent pas ces préfixes.
+
+    Args:
+        query (str): La requête SPARQL.
+        prefixes (dict, optional): Préfixes implicites (DBPEDIA_PREFIXES par défaut).
+
+    Returns:
+        str: La requête avec les noms préfixés implicites développés.
+    """
+    namespaces = dict(DBPEDIA_PREFIXES if prefixes is None else prefixes)
+    matches = [m for m in _TOKEN_RE.finditer(query) if m.lastgroup not in ("ws", "comment")]
+    # Les préfixes déclarés par la requête gardent leur définition
+    for previous, current in zip(matches, matches[1:]):
+        if previous.lastgroup == "word" and previous.group(0).upper() == "PREFIX" and current.lastgroup == "pname":
+            namespaces.pop(current.group(0).partition(":")[0], None)
+
+    parts = []
+    position = 0
+    for match in matches:
+        if match.lastgroup != "pname":
+            continue
+        text = match.group(0)
+        name = text.rstrip(".") if len(text) > 1 else text
+        prefix, _, local = name.partition(":")
+        if prefix not in namespaces:
+            continue
+        local = re.sub(r"\\(.)", r"\1", local)
+        parts.append(query[position:match.start()])
+        parts.append(f"<{namespaces[prefix]}{local}>" + text[len(name):])
+        position = match.end()
+    parts.append(query[position:])
+    return "".join(parts)
+
+def query_form(query):
+    """Forme de la requête (SELECT, ASK, CONSTRUCT ou DESCRIBE), None si aucune."""
+    for kind, text in tokenize_sparql(query):
+        if kind == "word" and text.upper() in ("SELECT", "ASK", "CONSTRUCT", "DESCRIBE"):
+            return text.upper()
+    return None
+
+def has_limit_or_offset(query):
+    """Vrai si la requête principale (hors sous-requêtes) a déjà un LIMIT ou un OFFSET."""
+    depth = 0
+    for kind, text in tokenize_sparql(query):
+        if kind == "punct" and text == "{":
+            depth += 1
+        elif kind == "punct" and text == "}":
+            depth -= 1
+        elif depth == 0 and kind == "word" and text.upper() in ("LIMIT", "OFFSET"):
+            return True
+    return False
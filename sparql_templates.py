@@ -0,0 +1,154 @@
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+
+from sparql_syntax import tokenize_sparql, query_form
+from predicate_rules import get_predicate_ranker
+
+TEMPLATE_MAP_FILE = "template_map.json"
+
+# Emplacement d'un template : "dbr:<S>", "dbo:<P>"... (préfixe, nom du slot)
+_SLOT_RE = re.compile(r"(\w+):<(\w+)>")
+# Le préfixe d'un slot détermine ce qui le remplit
+SLOT_KINDS = {"dbr": "entity", "dbo": "predicate"}
+
+# Marqueurs laissés dans la requête quand un slot n'a pas de valeur
+MISSING_MARKERS = {"S": "ERROR_MISSING_SUBJECT", "P": "ERROR_MISSING_PREDICATE", "O": "ERROR_MISSING_OBJECT"}
+# Sujet seul (pas de slot O, template A) : l'entité de la question
+MISSING_ENTITY = "ERROR_MISSING_ENTITY"
+
+def _projection(template):
+    """Variables projetées d'un SELECT (celle après AS pour une expression), [] pour ASK."""
+    variables = []
+    depth = 0
+    after_as = False
+    started = False
+    for kind, text in tokenize_sparql(template):
+        word = text.upper() if kind == "word" else None
+        if not started:
+            started = word == "SELECT"
+            continue
+        if word == "WHERE" or (kind == "punct" and text == "{" and depth == 0):
+            break
+        if kind == "punct" and text == "(":
+            depth += 1
+        elif kind == "punct" and text == ")":
+            depth -= 1
+        elif word == "AS":
+            after_as = True
+        elif kind == "var" and (depth == 0 or after_as):
+            variables.append(text)
+            after_as = False
+        elif kind == "punct" and text == "*" and depth == 0:
+            variables.append("*")
+    return variables
+
+class CompiledTemplate:
+    """
+    Template SPARQL de template_map.json analysé une seule fois.
+
+    Le texte est découpé en morceaux fixes et en slots typés : un slot "dbr:" reçoit une
+    entité (les entités de la question sont attribuées dans l'ordre des slots), un slot
+    "dbo:" un prédicat (les mieux classés par predicate_rules, dans l'ordre des slots).
+    Le rendu est un simple assemblage des morceaux : COUNT, ORDER BY, plusieurs triplets...
+    ne demandent qu'une nouvelle entrée dans template_map.json.
+
+    Attributes:
+        template_id (str): Identifiant du template ("A", "B", "D"...).
+        form (str): "SELECT", "ASK"...
+        projection (list): Variables projetées ([] pour ASK).
+        entity_slots (list): Noms des slots d'entité, dans l'ordre du template.
+        predicate_slots (list): Noms des slots de prédicat, dans l'ordre du template.
+    """
+
+    def __init__(self, template_id, sparql_template):
+        self.template_id = template_id
+        self.text = sparql_template
+        self.form = query_form(sparql_template)
+        self.projection = _projection(sparql_template)
+        self.parts = []
+        self.entity_slots = []
+        self.predicate_slots = []
+        position = 0
+        for match in _SLOT_RE.finditer(sparql_template):
+            prefix, name = match.groups()
+            if prefix not in SLOT_KINDS:
+                raise ValueError(f"Template {template_id}: unsupported slot {match.group(0)}")
+            slots = self.entity_slots if SLOT_KINDS[prefix] == "entity" else self.predicate_slots
+            if name not in slots:
+                slots.append(name)
+            self.parts.append(sparql_template[position:match.start()])
+            self.parts.append((name,))
+            position = match.end()
+        self.parts.append(sparql_template[position:])
+
+        self.missing = {name: MISSING_MARKERS.get(name, f"ERROR_MISSING_{name.upper()}")
+                        for name in self.entity_slots + self.predicate_slots}
+        if "S" in self.entity_slots and "O" not in self.entity_slots:
+            self.missing["S"] = MISSING_ENTITY
+
+    def render(self, values):
+        """Requête avec les valeurs données ({slot: "dbr:..."}), marqueur d'erreur pour les slots absents."""
+        return "".join(part if isinstance(part, str) else (values.get(part[0]) or self.missing[part[0]])
+                       for part in self.parts)
+
+    def fill(self, question, mappings):
+        """
+        Remplit les slots à partir des mappings d'une question.
+
+        Args:
+            question (str): La question (pour le classement des prédicats).
+            mappings (dict): Les mappings corrigés (voir generate_sparql.fix_dbr_resources).
+
+        Returns:
+            str: La requête SPARQL.
+        """
+        values = dict(zip(self.entity_slots, [value for value in mappings.values() if value.startswith("dbr:")]))
+        if len(self.predicate_slots) == 1:
+            values[self.predicate_slots[0]] = get_predicate_ranker().best_predicate(self.template_id, question, mappings)
+        elif self.predicate_slots:
+            values.update(zip(self.predicate_slots, get_predicate_ranker().ranked_predicates(self.template_id, question, mappings)))
+        return self.render(values)
+
+    def __repr__(self):
+        return f"CompiledTemplate({self.template_id!r}, {self.text!r})"
+
+@lru_cache(maxsize=256)
+def compile_template(template_id, sparql_template):
+    """CompiledTemplate d'un texte de template (analysé une seule fois par texte)."""
+    return CompiledTemplate(template_id, sparql_template)
+
+def compile_templates(template_map):
+    """Compile une table de templates déjà chargée ({id: {"sparql_template": ...}})."""
+    return {template_id: compile_template(template_id, entry["sparql_template"])
+            for template_id, entry in template_map.items()}
+
+def get_template(templates, template_id):
+    """Template compilé d'une table compilée ou brute (compilation mise en cache)."""
+    template = templates[template_id]
+    if isinstance(template, CompiledTemplate):
+        return template
+    return compile_template(template_id, template["sparql_template"])
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+def load_templates(path=TEMPLATE_MAP_FILE):
+    """
+    Table des templates compilés d'un fichier, relue seulement si le fichier a changé.
+
+    Returns:
+        dict: {template_id: CompiledTemplate}
+    """
+    mtime = os.path.getmtime(path)
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        templates = compile_templates(json.load(f))
+    with _loaded_lock:
+        _loaded[path] = (mtime, templates)
+    return templates
@@ -1,65 +1,101 @@
-from SPARQLWrapper import SPARQLWrapper, JSON, SPARQLExceptions
 import re
+from endpoint_client import get_default_client
+from sparql_cache import get_result_cache
+from sparql_syntax import check_sparql_syntax, query_form, has_limit_or_offset
 
-# DBpedia SPARQL endpoint URL
-DBPEDIA_ENDPOINT = "https://dbpedia.org/sparql"
+# Taille des pages LIMIT/OFFSET des résultats en streaming (sous le plafond de 10000 lignes de DBpedia)
+DEFAULT_PAGE_SIZE = 1000
 
-def validate_sparql_query(query):
+def run_sparql_query(query, use_cache=True, check_syntax=True, execution=None):
     """
-    Validates if a SPARQL query is syntactically correct using SPARQLWrapper
-    without executing it.
+    Validates and executes a SPARQL query with a single endpoint round trip.
+    Malformed queries are rejected by the local rdflib parser before any
+    network call.
     
     Args:
-        query (str): The SPARQL query to validate
+        query (str): The SPARQL query to validate and execute
+        use_cache (bool): Whether to go through the result cache
+        check_syntax (bool): Whether to parse the query locally first
+        execution (dict, optional): Already fetched result in the execute_sparql_query
+            format (e.g. from async_sparql.AsyncSparqlExecutor); no request is sent
         
     Returns:
-        tuple: (is_valid, error_message)
+        dict: Combined outcome with the keys
+            valid (bool), validation_message (str), sent (bool, the query passed the
+            local checks and went to the endpoint), success (bool, the query ran),
+            results (raw endpoint JSON or None), formatted_results (list) and
+            error (str or None)
     """
+    outcome = {
+        "valid": False,
+        "validation_message": "",
+        "sent": False,
+        "success": False,
+        "results": None,
+        "formatted_results": [],
+        "error": None
+    }
+
     # Basic syntax check (contains basic SPARQL keywords)
-    basic_check = False
-    if re.search(r'\b(SELECT|ASK|CONSTRUCT|DESCRIBE)\b', query, re.IGNORECASE):
-        basic_check = True
-    
-    if not basic_check:
-        return False, "Query does not contain a valid SPARQL operation (SELECT, ASK, CONSTRUCT, or DESCRIBE)"
-    
-    # Validate query using SPARQLWrapper
+    if not re.search(r'\b(SELECT|ASK|CONSTRUCT|DESCRIBE)\b', query, re.IGNORECASE):
+        outcome["validation_message"] = "Query does not contain a valid SPARQL operation (SELECT, ASK, CONSTRUCT, or DESCRIBE)"
+        outcome["error"] = outcome["validation_message"]
+        return outcome
+
+    if check_syntax:
+        syntax_ok, syntax_message = check_sparql_syntax(query)
+        if not syntax_ok:
+            outcome["validation_message"] = f"Invalid query: {syntax_message}"
+            outcome["error"] = syntax_message
+            return outcome
+
+    if execution is None:
+        execution = execute_sparql_query(query, use_cache=use_cache)
+    outcome["sent"] = True
+    if not execution["success"]:
+        outcome["validation_message"] = f"Invalid query: {execution['error']}"
+        outcome["error"] = execution["error"]
+        outcome["formatted_results"] = extract_results_for_display(execution)
+        return outcome
+
+    outcome["success"] = True
+    outcome["results"] = execution["results"]
     try:
-        sparql = SPARQLWrapper(DBPEDIA_ENDPOINT)
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        
-        # Set method to POST for validation without execution
-        sparql.setMethod('POST')
-        sparql.setRequestMethod('urlencoded')
-        
-        # Additional validation header
-        sparql.addCustomHttpHeader('X-Validate', 'true')
-        
-        # Attempt to prepare the query (will raise exception if invalid)
-        sparql.query()
-        
-        # Check if query actually returns results
-        try:
-            test_results = execute_sparql_query(query)
-            
-            # If execution was successful
-            if test_results["success"]:
-                formatted_results = extract_results_for_display(test_results)
-                
-                # If there are no results found, mark as invalid
-                if len(formatted_results) == 1 and formatted_results[0] == "No results found":
-                    return False, "Query is syntactically valid but returns no results"
-            
-            return True, "Query is valid and returns results"
-        except Exception as exec_err:
-            # If there was an issue testing the query, still mark as valid syntactically
-            return True, "Query is syntactically valid, but couldn't verify results"
+        outcome["formatted_results"] = extract_results_for_display(execution)
+    except Exception:
+        # The query ran but the results could not be read: still valid syntactically
+        outcome["valid"] = True
+        outcome["validation_message"] = "Query is syntactically valid, but couldn't verify results"
+        return outcome
+
+    # If there are no results found, mark as invalid
+    if len(outcome["formatted_results"]) == 1 and outcome["formatted_results"][0] == "No results found":
+        outcome["validation_message"] = "Query is syntactically valid but returns no results"
+        return outcome
+
+    outcome["valid"] = True
+    outcome["validation_message"] = "Query is valid and returns results"
+    return outcome
+
+def validate_sparql_query(query, offline=False):
+    """
+    Validates if a SPARQL query is syntactically correct and returns results.
+    Thin wrapper around run_sparql_query for callers that only need the verdict.
+    
+    Args:
+        query (str): The SPARQL query to validate
+        offline (bool): Only check the syntax locally, without contacting the endpoint
         
-    except Exception as e:
-        # Extract the error message
-        error_msg = str(e)
-        return False, f"Invalid query: {error_msg}"
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if offline:
+        if not re.search(r'\b(SELECT|ASK|CONSTRUCT|DESCRIBE)\b', query, re.IGNORECASE):
+            return False, "Query does not contain a valid SPARQL operation (SELECT, ASK, CONSTRUCT, or DESCRIBE)"
+        return check_sparql_syntax(query)
+
+    outcome = run_sparql_query(query)
+    return outcome["valid"], outcome["validation_message"]
 
 def clean_sparql_query(query_text):
     """
@@ -81,33 +117,75 @@ def clean_sparql_query(query_text):
     # If no code blocks, just clean the string
     return query_text.strip()
 
-def execute_sparql_query(query):
+def execute_sparql_query(query, use_cache=True):
     """
     Execute a SPARQL query on DBpedia and return the results.
+    The request goes through the shared pooled endpoint client, and outcomes
+    (including empty results and queries refused by the endpoint, but not
+    timeouts, network or server errors) through the shared result cache,
+    see sparql_cache.configure_result_cache.
     
     Args:
         query (str): The SPARQL query to execute
+        use_cache (bool): Whether to read and update the result cache
         
     Returns:
         dict: The results of the query in JSON format
     """
-    sparql = SPARQLWrapper(DBPEDIA_ENDPOINT)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    
+    cache = get_result_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(query)
+        if cached is not None:
+            return cached
+
     try:
-        results = sparql.query().convert()
-        return {
+        results = get_default_client().query(query)
+        outcome = {
             "success": True,
             "results": results
         }
     except Exception as e:
         error_msg = str(e)
-        return {
+        outcome = {
             "success": False,
-            "error": error_msg
+            "error": error_msg,
+            # HTTP status of the refusal, None for network errors (never cached)
+            "status": getattr(e, "status", None)
         }
 
+    if cache is not None:
+        cache.put(query, outcome)
+    return outcome
+
+def format_binding(row):
+    """
+    Format one result row (a SPARQL JSON binding) for readable display.
+    
+    Args:
+        row (dict): Variable name -> {"type", "value", "datatype"...}
+        
+    Returns:
+        dict: Variable name -> readable value
+    """
+    result_row = {}
+    for var_name, var_data in row.items():
+        value = var_data["value"]
+        datatype = var_data.get("datatype", "")
+        
+        # Clean up URI references to make them more readable
+        if var_data.get("type") == "uri" and value.startswith("http://dbpedia.org/resource/"):
+            value = value.replace("http://dbpedia.org/resource/", "")
+            value = value.replace("_", " ")
+        
+        # Format values based on datatype
+        if "date" in datatype.lower():
+            value = f"Date: {value}"
+        elif "integer" in datatype.lower() or "decimal" in datatype.lower():
+            value = f"Number: {value}"
+        
+        result_row[var_name] = value
+    return result_row
+
 def extract_results_for_display(query_results):
     """
     Extract and format query results for readable display.
@@ -132,26 +210,70 @@ def extract_results_for_display(query_results):
     if not bindings:
         return ["No results found"]
     
-    formatted_results = []
-    for row in bindings:
-        result_row = {}
-        for var_name, var_data in row.items():
-            value = var_data["value"]
-            datatype = var_data.get("datatype", "")
-            
-            # Clean up URI references to make them more readable
-            if var_data.get("type") == "uri" and value.startswith("http://dbpedia.org/resource/"):
-                value = value.replace("http://dbpedia.org/resource/", "")
-                value = value.replace("_", " ")
-            
-            # Format values based on datatype
-            if "date" in datatype.lower():
-                value = f"Date: {value}"
-            elif "integer" in datatype.lower() or "decimal" in datatype.lower():
-                value = f"Number: {value}"
-            
-            result_row[var_name] = value
+    return [format_binding(row) for row in bindings]
+
+def stream_sparql_results(query, page_size=DEFAULT_PAGE_SIZE, client=None):
+    """
+    Iterate over the bindings of a SELECT query without loading the whole result set.
+    
+    Without its own LIMIT/OFFSET, the query is sent page by page (LIMIT page_size
+    OFFSET n) until a page comes back incomplete; each page is parsed incrementally
+    when the client supports it (EndpointClient.stream_query). Pages rely on the
+    server returning solutions in a stable order, so add an ORDER BY when it matters.
+    Results do not go through the result cache.
+    
+    Args:
+        query (str): The SELECT query
+        page_size (int): Number of rows requested per page (None: a single request)
+        client: Endpoint client (the shared client by default)
         
-        formatted_results.append(result_row)
+    Yields:
+        dict: One binding per result row
+        
+    Raises:
+        SparqlEndpointError: If a page cannot be fetched
+    """
+    client = client or get_default_client()
+    
+    def fetch(page_query):
+        if hasattr(client, "stream_query"):
+            return client.stream_query(page_query)
+        return iter(client.query(page_query).get("results", {}).get("bindings", []))
+    
+    if not page_size or has_limit_or_offset(query):
+        yield from fetch(query)
+        return
+    
+    offset = 0
+    while True:
+        count = 0
+        for binding in fetch(f"{query.rstrip()}\nLIMIT {page_size} OFFSET {offset}"):
+            count += 1
+            yield binding
+        if count < page_size:
+            return
+        offset += page_size
+
+def iter_formatted_results(query, page_size=DEFAULT_PAGE_SIZE, client=None):
+    """
+    Lazily yield formatted result rows, as extract_results_for_display would list them.
+    Only SELECT queries are streamed; other query forms are executed in one request.
+    
+    Args:
+        query (str): The SPARQL query
+        page_size (int): Number of rows requested per page
+        client: Endpoint client (the shared client by default)
+        
+    Yields:
+        dict or str: Formatted rows ("Yes"/"No" for ASK, "No results found" if empty)
+    """
+    if query_form(query) != "SELECT":
+        yield from extract_results_for_display(execute_sparql_query(query))
+        return
     
-    return formatted_results 
\ No newline at end of file
+    empty = True
+    for binding in stream_sparql_results(query, page_size, client):
+        empty = False
+        yield format_binding(binding)
+    if empty:
+        yield "No results found"
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Nombre maximal d'écritures entre deux contrôles de la taille du cache
+TRIM_INTERVAL = 100
+# last_access n'est réécrit que s'il date de plus de ACCESS_RESOLUTION secondes
+ACCESS_RESOLUTION = 10.0
+
+class SQLiteCache:
+    """
+    Cache clé -> valeur JSON stocké dans un fichier SQLite.
+
+    - TTL par entrée (ttl par défaut du cache, surchargeable à chaque put) ;
+    - taille bornée : au-delà de max_entries, les entrées les moins récemment lues sont supprimées
+      (la taille n'est contrôlée que toutes les quelques écritures, voir TRIM_INTERVAL, et
+      l'heure de lecture n'est précise qu'à ACCESS_RESOLUTION secondes près) ;
+    - mode WAL : le fichier peut être partagé entre plusieurs processus.
+    """
+
+    def __init__(self, path, ttl=None, max_entries=None, table="cache"):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        # Au moins un contrôle par centième de max_entries écrit, et dès la première écriture
+        self._trim_every = min(TRIM_INTERVAL, max(1, (max_entries or 0) // 100))
+        self._puts_since_trim = self._trim_every
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, "
+            "expires_at REAL, last_access REAL NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)")
+        self._db.commit()
+
+    def get(self, key):
+        """Retourne la valeur associée à key, ou None si absente ou expirée."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT value, expires_at, last_access FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._db.commit()
+                self.misses += 1
+                return None
+            if now - row[2] > ACCESS_RESOLUTION:
+                # Une lecture fréquente n'écrit pas à chaque fois dans la base
+                self._db.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            self.hits += 1
+            self.bytes_read += len(row[0])
+        return json.loads(row[0])
+
+    def put(self, key, value, ttl=None):
+        """Enregistre value (sérialisable en JSON) ; ttl en secondes, None pour le TTL par défaut."""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        data = json.dumps(value, ensure_ascii=False, default=str)
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, data, now, expires_at, now),
+            )
+            self.bytes_written += len(data)
+            if self.max_entries is not None:
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= self._trim_every:
+                    self._puts_since_trim = 0
+                    self._trim()
+            self._db.commit()
+
+    def _trim(self):
+        """Supprime les entrées les moins récemment lues au-delà de max_entries (verrou tenu)."""
+        excess = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+        if excess > 0:
+            # Parcours de l'index sur last_access : seules les entrées supprimées sont lues
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+
+    def delete(self, key):
+        """Supprime une entrée ; retourne True si elle existait."""
+        with self._lock:
+            deleted = self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,)).rowcount
+            self._db.commit()
+        return deleted > 0
+
+    def items(self):
+        """Liste des couples (clé, valeur) non expirés, sans compter de hit."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT key, value FROM {self.table} WHERE expires_at IS NULL OR expires_at > ? ORDER BY created_at",
+                (time.time(),),
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def clear(self):
+        """Vide le cache ; retourne le nombre d'entrées supprimées."""
+        with self._lock:
+            deleted = self._db.execute(f"DELETE FROM {self.table}").rowcount
+            self._db.commit()
+        return deleted
+
+    def purge_expired(self):
+        """Supprime les entrées expirées ; retourne leur nombre."""
+        with self._lock:
+            deleted = self._db.execute(
+                f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+            self._db.commit()
+        return deleted
+
+    def stats(self):
+        """Hits, misses, taux de succès, octets lus/écrits et nombre d'entrées."""
+        with self._lock:
+            entries = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
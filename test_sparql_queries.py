@@ -1,28 +1,36 @@
 import json
 import sys
-import os
-from sparql_utils import validate_sparql_query, execute_sparql_query, extract_results_for_display
-from generate_sparql import generate_sparql_query
+from sparql_utils import run_sparql_query
+from generate_sparql import generate_sparql_for_question
+from sparql_templates import load_templates
+from sparql_cache import configure_result_cache, get_result_cache
+from sparql_syntax import check_sparql_syntax
+from endpoint_client import configure_endpoint
+from jsonl_checkpoint import JsonlCheckpoint, read_jsonl, jsonl_to_json
 
 def load_json_file(file_path):
     """Load a JSON file and return its contents."""
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
-def process_single_query(query_dict):
+def process_single_query(query_dict, templates=None, cancelled=None):
     """
     Process a single query dictionary in the format from mapped_classified_questions.json
     
     Args:
         query_dict (dict): A single query dictionary with question, template_id, and mapping
+        templates (dict, optional): Already loaded template map; the compiled template_map.json if None
+        cancelled (threading.Event, optional): When set before the query is sent, the query
+            is not executed (speculative execution in main.py)
         
     Returns:
         dict: Results of testing the query
     """
-    # Load the templates
-    templates = load_json_file('template_map.json')
+    # Compiled templates, only re-read when template_map.json changes
+    if templates is None:
+        templates = load_templates()
     
-    # Use the generate_sparql_query function to create a SPARQL query
+    # Use the generate_sparql_for_question function to create a SPARQL query
     query_result = {}
     
     # Check if this is a correctly structured query dict
@@ -35,10 +43,7 @@ def process_single_query(query_dict):
     
     # Generate the SPARQL query using the same logic as in generate_sparql.py
     try:
-        # Create a list with just this query to match the function's expected input
-        query_list = [query_dict]
-        # Generate the query (use index 0 since we only have one query)
-        query_result = generate_sparql_query(0, query_list, templates)
+        query_result = generate_sparql_for_question(query_dict, templates)
     except Exception as e:
         return {
             "question": query_dict.get("question", "Unknown question"),
@@ -67,8 +72,17 @@ def process_single_query(query_dict):
             "executed": False
         }
     
-    # Validate the query
-    is_valid, validation_message = validate_sparql_query(sparql_query)
+    if cancelled is not None and cancelled.is_set():
+        return {
+            "question": query_dict["question"],
+            "query": sparql_query,
+            "error": "Cancelled",
+            "valid": False,
+            "executed": False
+        }
+    
+    # Validate and execute the query in a single round trip
+    outcome = run_sparql_query(sparql_query)
     
     result = {
         "question": query_dict["question"],
@@ -76,43 +90,140 @@ def process_single_query(query_dict):
         "query": sparql_query,
         "entity_mappings": query_result.get("entity_mappings", {}),
         "predicate_mappings": query_result.get("predicate_mappings", {}),
-        "valid": is_valid,
-        "validation_message": validation_message
+        "valid": outcome["valid"],
+        "validation_message": outcome["validation_message"],
+        "executed": outcome["valid"] and outcome["success"]
     }
     
-    if is_valid:
-        # Execute the query
-        try:
-            execution_results = execute_sparql_query(sparql_query)
-            result["executed"] = execution_results["success"]
-            
-            if execution_results["success"]:
-                # Extract formatted results
-                formatted_results = extract_results_for_display(execution_results)
-                result["results"] = formatted_results
-                
-                # Check if results are empty
-                if len(formatted_results) == 1 and formatted_results[0] == "No results found":
-                    result["valid"] = False
-                    result["validation_message"] = "Query is syntactically valid but returns no results"
-            else:
-                result["execution_error"] = execution_results["error"]
-        except Exception as e:
-            result["executed"] = False
-            result["execution_error"] = str(e)
+    if result["executed"]:
+        result["results"] = outcome["formatted_results"]
+    
+    return result
+
+def prefetch_executions(queries, concurrency=1, batch=False, verbose=True):
+    """Execute the runnable queries of the entries ahead of their evaluation.
+    
+    Args:
+        queries (list): Entries of the results file
+        concurrency (int): Maximum number of requests in flight
+        batch (bool): Group same-shape template queries into VALUES queries
+        verbose (bool): Whether to print the number of requests sent
+        
+    Returns:
+        dict: SPARQL query -> result in the execute_sparql_query format
+    """
+    pending = []
+    for entry in queries:
+        if not isinstance(entry, dict):
+            continue
+        query = entry.get("sparql_query")
+        # Queries rejected locally by run_sparql_query are never sent
+        if query and "ERROR_MISSING" not in query and check_sparql_syntax(query)[0]:
+            pending.append(query)
+    
+    if batch:
+        from sparql_batch import BatchedSparqlExecutor
+        executor = BatchedSparqlExecutor(concurrency=concurrency)
+        executions = executor.run(pending)
+        if verbose:
+            print(f"Sent {executor.requests} requests for {len(pending)} queries")
     else:
-        result["executed"] = False
+        from async_sparql import AsyncSparqlExecutor
+        executions = AsyncSparqlExecutor(concurrency=concurrency).run(pending)
+    return dict(zip(pending, executions))
+
+def is_kept_result(result):
+    """Whether a test result goes to the saved output file.
+    
+    Excluded: "No results found", 'unknown' template errors, missing or incomplete
+    queries and queries that are valid but return no results.
+    """
+    return not (
+        # Exclude "No results found"
+        ("results" in result and 
+         isinstance(result["results"], list) and 
+         len(result["results"]) == 1 and 
+         result["results"][0] == "No results found") or
+        # Exclude unknown template errors
+        (isinstance(result.get("error", ""), str) and 
+         "Template ID 'unknown'" in result.get("error", "")) or
+        # Exclude missing or incomplete queries
+        (isinstance(result.get("error", ""), str) and 
+         "Missing or incomplete query" in result.get("error", "")) or
+        # Exclude queries that are valid but return no results
+        (isinstance(result.get("validation_message", ""), str) and
+         "Query is syntactically valid but returns no results" in result.get("validation_message", ""))
+    )
+
+def check_query_entry(i, entry, execution=None):
+    """Test one entry of the results file and return its test result (with its index)."""
+    # Skip entries that are error messages (strings)
+    if isinstance(entry, str):
+        return {
+            "index": i,
+            "error": entry,
+            "valid": False,
+            "executed": False
+        }
+    
+    # Extract the query
+    question = entry.get("question", "No question")
+    query = entry.get("sparql_query", None)
     
+    if not query or "ERROR_MISSING" in query:
+        return {
+            "index": i,
+            "question": question,
+            "error": "Missing or incomplete query",
+            "valid": False,
+            "executed": False
+        }
+    
+    # Validate and execute the query in a single round trip
+    outcome = run_sparql_query(query, execution=execution)
+    
+    result = {
+        "index": i,
+        "question": question,
+        "query": query,
+        "valid": outcome["valid"],
+        "validation_message": outcome["validation_message"]
+    }
+    
+    # Same record as the former validate-then-execute sequence: a query that runs
+    # without results is invalid and not executed, execution_error is only set
+    # when the endpoint call itself failed
+    result["executed"] = outcome["valid"] and outcome["success"]
+    if result["executed"]:
+        result["results"] = outcome["formatted_results"]
+    elif outcome["sent"] and not outcome["success"]:
+        result["execution_error"] = outcome["error"]
     return result
 
-def test_queries(results_file, output_file=None, limit=None, verbose=True):
+def test_queries(results_file, output_file=None, limit=None, verbose=True, concurrency=1, batch=False, resume=False,
+                 return_results=True):
     """Test each SPARQL query in the results file.
     
+    Each test result is appended to a JSONL file as soon as the query has been checked,
+    and its index recorded in the checkpoint `<jsonl>.done` (see jsonl_checkpoint), removed
+    at the end. With a .jsonl output_file, that file holds every test result; otherwise the records go to
+    `<output_file>.partial.jsonl`, which is turned into the filtered JSON array at the end.
+    
     Args:
         results_file (str): Path to the JSON file with SPARQL queries
-        output_file (str, optional): Path to save test results
+        output_file (str, optional): Path to save test results (.json or .jsonl)
         limit (int, optional): Limit the number of queries to test
         verbose (bool): Whether to print progress and results
+        concurrency (int): Number of queries executed in parallel (1 = one after the other)
+        batch (bool): Send same-shape template queries as batched VALUES queries
+        resume (bool): Skip the queries already recorded in the checkpoint of output_file
+        return_results (bool): Keep the test results in memory to return them; without it
+            only the summary counters are kept and memory does not grow with the run
+            (the command line relies on the output file instead)
+    
+    Returns:
+        list: Test results of all the queries in file order, resumed queries included
+            (None when return_results is False)
     """
     # Load the results file
     print(f"Loading queries from {results_file}...")
@@ -137,77 +248,51 @@ def test_queries(results_file, output_file=None, limit=None, verbose=True):
         queries = queries[:limit]
         print(f"Testing first {limit} queries...")
     
-    # Test each query
-    for i, entry in enumerate(queries):
-        if i % 10 == 0 and verbose:
-            print(f"Testing query {i+1}/{len(queries)}...")
-        
-        # Skip entries that are error messages (strings)
-        if isinstance(entry, str):
-            test_results.append({
-                "index": i,
-                "error": entry,
-                "valid": False,
-                "executed": False
-            })
-            error_count += 1
-            continue
-        
-        # Extract the query
-        question = entry.get("question", "No question")
-        query = entry.get("sparql_query", None)
-        
-        if not query or "ERROR_MISSING" in query:
-            test_results.append({
-                "index": i,
-                "question": question,
-                "error": "Missing or incomplete query",
-                "valid": False,
-                "executed": False
-            })
-            error_count += 1
-            continue
-        
-        # Validate the query
-        is_valid, validation_message = validate_sparql_query(query)
-        
-        result = {
-            "index": i,
-            "question": question,
-            "query": query,
-            "valid": is_valid,
-            "validation_message": validation_message
-        }
-        
-        if is_valid:
-            # Execute the query
-            try:
-                execution_results = execute_sparql_query(query)
-                result["executed"] = execution_results["success"]
-                
-                if execution_results["success"]:
-                    # Extract formatted results
-                    formatted_results = extract_results_for_display(execution_results)
-                    result["results"] = formatted_results
-                    
-                    # Check if results are empty
-                    if len(formatted_results) == 1 and formatted_results[0] == "No results found":
-                        result["valid"] = False
-                        result["validation_message"] = "Query is syntactically valid but returns no results"
-                        no_results_count += 1
-                    else:
-                        valid_count += 1
-                        executed_count += 1
-                else:
-                    result["execution_error"] = execution_results["error"]
-            except Exception as e:
-                result["executed"] = False
-                result["execution_error"] = str(e)
+    # Records are streamed to a JSONL file, resumable through its checkpoint
+    checkpoint = None
+    if output_file:
+        jsonl_file = output_file if output_file.endswith(".jsonl") else output_file + ".partial.jsonl"
+        checkpoint = JsonlCheckpoint(jsonl_file, resume)
+    done = checkpoint.done if checkpoint is not None else set()
+    pending = [i for i in range(len(queries)) if i not in done]
+    
+    def count(result):
+        nonlocal valid_count, executed_count, error_count
+        if return_results:
+            test_results.append(result)
+        if result["valid"]:
+            valid_count += 1
+            executed_count += 1
         else:
-            result["executed"] = False
             error_count += 1
+    
+    if done:
+        print(f"Resuming: skipping {len(queries) - len(pending)} queries already tested")
+        for result in read_jsonl(checkpoint.path):
+            count(result)
+    
+    try:
+        # Run the queries concurrently or in batches first; results are then checked in order
+        prefetched = {}
+        if batch or (concurrency and concurrency > 1):
+            if verbose:
+                print(f"Executing queries (concurrency {concurrency}, batch={batch})...")
+            prefetched = prefetch_executions([queries[i] for i in pending], concurrency, batch, verbose)
         
-        test_results.append(result)
+        # Test each query
+        for n, i in enumerate(pending):
+            if n % 10 == 0 and verbose:
+                print(f"Testing query {i+1}/{len(queries)}...")
+            
+            entry = queries[i]
+            query = entry.get("sparql_query") if isinstance(entry, dict) else None
+            result = check_query_entry(i, entry, prefetched.get(query))
+            count(result)
+            if checkpoint is not None:
+                checkpoint.write(i, result)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
     
     # Print summary
     print("\nTest Summary:")
@@ -218,35 +303,19 @@ def test_queries(results_file, output_file=None, limit=None, verbose=True):
     print(f"Errors/invalid: {error_count} ({error_count/len(queries)*100:.1f}%)")
     
     # Save results if output file specified
-    if output_file:
-        # Filter out:
-        # 1. Results with "No results found"
-        # 2. Entries with 'unknown' template errors
-        # 3. Missing or incomplete queries
-        # 4. Queries with validation message about returning no results
-        filtered_results = [result for result in test_results if not (
-            # Exclude "No results found"
-            ("results" in result and 
-             isinstance(result["results"], list) and 
-             len(result["results"]) == 1 and 
-             result["results"][0] == "No results found") or
-            # Exclude unknown template errors
-            (isinstance(result.get("error", ""), str) and 
-             "Template ID 'unknown'" in result.get("error", "")) or
-            # Exclude missing or incomplete queries
-            (isinstance(result.get("error", ""), str) and 
-             "Missing or incomplete query" in result.get("error", "")) or
-            # Exclude queries that are valid but return no results
-            (isinstance(result.get("validation_message", ""), str) and
-             "Query is syntactically valid but returns no results" in result.get("validation_message", ""))
-        )]
-        
-        print(f"Saving {len(filtered_results)} valid queries with results (excluded {len(test_results) - len(filtered_results)} invalid queries)")
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(filtered_results, f, indent=2)
+    if checkpoint is not None and checkpoint.path != output_file:
+        saved = jsonl_to_json(checkpoint.path, output_file, keep=is_kept_result)
+        print(f"Saving {saved} valid queries with results (excluded {len(queries) - saved} invalid queries)")
+        checkpoint.remove()
         print(f"Test results saved to {output_file}")
+    elif checkpoint is not None:
+        checkpoint.finish()
+        print(f"Test results streamed to {output_file}")
     
+    if not return_results:
+        return None
+    # Resumed results come first
+    test_results.sort(key=lambda result: result["index"])
     return test_results
 
 def main():
@@ -254,10 +323,15 @@ def main():
     # Parse command-line arguments
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python test_sparql_queries.py <results_file.json> [output_file.json] [--limit N]")
+        print("  python test_sparql_queries.py <results_file.json> [output_file.json|.jsonl] [--limit N] [--concurrency N] [--batch] [--resume] [--no-cache] [--endpoint URL[,MIRROR...]|local:FILE]")
         print("  python test_sparql_queries.py --single '<json_string>'")
+        print("\nSPARQL results are cached by default in sparql_cache.sqlite (current directory); --no-cache disables it.")
         print("\nExamples:")
         print("  python test_sparql_queries.py improved_results.json test_results.json --limit 10")
+        print("  python test_sparql_queries.py improved_results.json test_results.json --concurrency 16")
+        print("  python test_sparql_queries.py improved_results.json test_results.json --batch")
+        print("  python test_sparql_queries.py improved_results.json --endpoint local:dbpedia_subset.nt")
+        print("  python test_sparql_queries.py improved_results.json test_results.json --resume")
         print("  python test_sparql_queries.py --single '{\"question\": \"give me the currency of China .\", \"template_id\": \"A\", \"mapping\": {\"currency\": \"dbo:currency\", \"of\": \"dbo:Of\", \"China\": \"dbr:china\"}}'")
         sys.exit(1)
     
@@ -292,21 +366,49 @@ def main():
     results_file = sys.argv[1]
     output_file = None
     limit = None
+    concurrency = 1
+    batch = False
+    resume = False
     
     # Parse optional arguments
-    for i in range(2, len(sys.argv)):
-        if sys.argv[i] == "--limit" and i + 1 < len(sys.argv):
+    i = 2
+    while i < len(sys.argv):
+        if sys.argv[i] == "--no-cache":
+            configure_result_cache(None)
+        elif sys.argv[i] == "--batch":
+            batch = True
+        elif sys.argv[i] == "--resume":
+            resume = True
+        elif sys.argv[i] == "--endpoint" and i + 1 < len(sys.argv):
+            configure_endpoint(sys.argv[i + 1])
+            i += 1
+        elif sys.argv[i] in ("--limit", "--concurrency") and i + 1 < len(sys.argv):
             try:
-                limit = int(sys.argv[i + 1])
+                value = int(sys.argv[i + 1])
             except ValueError:
-                print(f"Error: Limit must be an integer, got '{sys.argv[i + 1]}'")
+                print(f"Error: {sys.argv[i][2:].capitalize()} must be an integer, got '{sys.argv[i + 1]}'")
                 sys.exit(1)
+            if sys.argv[i] == "--limit":
+                limit = value
+            else:
+                concurrency = value
+            # The value is not the output file
+            i += 1
         elif not sys.argv[i].startswith("--") and not output_file:
             output_file = sys.argv[i]
+        i += 1
+    
+    if resume and not output_file:
+        print("Error: --resume needs the output file of the interrupted run")
+        sys.exit(1)
     
     # Run tests
     try:
-        test_queries(results_file, output_file, limit)
+        test_queries(results_file, output_file, limit, concurrency=concurrency, batch=batch, resume=resume,
+                     return_results=False)
+        cache = get_result_cache()
+        if cache is not None:
+            print(f"SPARQL result cache: {cache.stats()}")
     except FileNotFoundError as e:
         print(f"Error: File not found - {str(e)}")
         sys.exit(1)